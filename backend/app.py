@@ -233,25 +233,49 @@ def search_tickers():
 if __name__ == '__main__':
     app.run(debug=True)
 """
-from flask import Flask, request, jsonify
-import yfinance as yf
+from flask import Flask, Response, request, jsonify, g
+import hashlib
+import time
 
 from flask_cors import CORS
 import os
-import pandas as pd
+import numpy as np
 from stock_data import (
     fetch_company_info,
+    fetch_stock_data,
     get_trending_stocks,
     get_top_losers,
-    search_tickers
+    search_tickers,
+    market_snapshot
 )
-from model import train_lstm_model, predict_next_days
+from model import (
+    load_or_train_model,
+    has_fresh_model,
+    predict_next_days,
+    backtest_stored_model,
+    stored_backtest,
+    stored_model_meta,
+    model_version,
+    progress_callback
+)
+from registry import data_version
+from backtest import BACKTEST_DAYS
+from chart_cache import ChartCache, CHART_KINDS, chart_key
 from charts import (
     generate_next_30_days_prediction_chart,
     generate_candlestick_chart,
-    generate_one_year_overlay_chart
+    generate_one_year_overlay_chart,
+    render_next_30_days_prediction_chart,
+    render_candlestick_chart,
+    render_one_year_overlay_chart,
+    CHART_FORMATS,
+    CHART_DPI
 )
-from utils import setup_logger, is_valid_ticker, validate_prediction_days, handle_error
+from utils import setup_logger, is_valid_ticker, reject_ticker, validate_prediction_days, handle_error
+from jobs import JobQueue, DONE, FAILED
+from stages import Stage, run_stages
+from fundamentals import FIELDS, MISSING
+import metrics
 
 # Initialize Flask app and CORS
 app = Flask(__name__)
@@ -264,21 +288,159 @@ logger = setup_logger()
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def is_valid_ticker(ticker):
-    try:
-        data = yf.Ticker(ticker)
-        hist = data.history(period="1d")
-        return not hist.empty
-    except Exception:
-        return False
+# Background training pool; TRAINING_WORKERS bounds concurrent model.fit calls
+job_queue = JobQueue(max_workers=int(os.environ.get('TRAINING_WORKERS', 1)))
+
+# Rendered chart images, keyed by the data and model versions they were drawn from
+chart_cache = ChartCache()
+
+CHART_MODES = ('url', 'inline', 'none')
+
+# Seconds each optional /api/predict stage may take before its fallback is used
+STAGE_TIMEOUTS = {
+    'info': float(os.environ.get('INFO_TIMEOUT', 5)),
+    'forecast': float(os.environ.get('FORECAST_TIMEOUT', 30)),
+    'backtest': float(os.environ.get('BACKTEST_TIMEOUT', 30)),
+    'chart': float(os.environ.get('CHART_TIMEOUT', 30)),
+}
+
+EMPTY_INFO = {field: MISSING for field in FIELDS}
+
+# Set SERVER_TIMING=1 to report per-stage timings to clients in a Server-Timing header
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') != '0'
+
+@app.before_request
+def start_timing():
+    g.started = time.perf_counter()
+    g.timings_token = metrics.start_request()
+
+@app.after_request
+def record_timing(response):
+    if 'started' not in g:
+        return response
+    total = time.perf_counter() - g.started
+    timings = metrics.end_request(g.pop('timings_token'))
+    metrics.request_seconds.observe(total, request.url_rule.rule if request.url_rule else 'unmatched', response.status_code)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = metrics.server_timing(timings, total)
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+def chart_keys(ticker, days, df, fmt='png', dpi=CHART_DPI):
+    version = data_version(df)
+    return {
+        'candlestick': chart_key('candlestick', ticker, days, fmt, dpi, version),
+        'next30': chart_key('next30', ticker, 30, fmt, dpi, version, model_version(stored_model_meta(ticker, 30))),
+        'overlay': chart_key('overlay', ticker, days, fmt, dpi, version, model_version(stored_model_meta(ticker, days))),
+    }
+
+def chart_urls(ticker, days, df):
+    return {
+        kind: f"/api/chart/{kind}/{ticker}?days={30 if kind == 'next30' else days}&v={key}"
+        for kind, key in chart_keys(ticker, days, df).items()
+    }
+
+def render_chart(kind, ticker, days, df, fmt='png', dpi=CHART_DPI):
+    """Renders one chart kind from stored data and models; returns the encoded image."""
+    if kind == 'candlestick':
+        image = render_candlestick_chart(df, days, fmt=fmt, dpi=dpi)
+    elif kind == 'next30':
+        # predict_next_days() returns None for a missing model; report it like the overlay does
+        if stored_model_meta(ticker, 30) is None:
+            raise FileNotFoundError(f"Model or scaler not found for {ticker}. Please train the model first.")
+        image = render_next_30_days_prediction_chart(predict_next_days(ticker, 30), ticker, fmt=fmt, dpi=dpi)
+    else:
+        actual, predicted = backtest_stored_model(ticker, days)
+        image = render_one_year_overlay_chart(actual, predicted, ticker, num_days=len(actual), fmt=fmt, dpi=dpi)
+    if not image:
+        raise ValueError(f"Failed to render {kind} chart for {ticker}")
+    return image
+
+def build_series(df, days, forecast, actual, predicted):
+    recent = df.tail(days)
+    return {
+        'history': {
+            'dates': recent.index.strftime('%Y-%m-%d').tolist(),
+            'open': recent['Open'].round(4).tolist(),
+            'high': recent['High'].round(4).tolist(),
+            'low': recent['Low'].round(4).tolist(),
+            'close': recent['Close'].round(4).tolist(),
+        },
+        'next_30_days': [round(float(p), 4) for p in forecast or []],
+        'one_year': {
+            'actual': np.round(actual, 4).tolist(),
+            'predicted': np.round(predicted, 4).tolist(),
+        },
+    }
+
+def build_prediction(ticker, days, charts='url', report=None):
+    callbacks = [progress_callback(report)] if report else None
+
+    def backtest_stage(_):
+        # Scores the holdout model on bars it was not trained on
+        result = stored_backtest(ticker, days)
+        return (np.asarray(result['series']['actual']), np.asarray(result['series']['predicted']),
+                result['metrics'])
+
+    # Company info and the candlestick chart need no model, so they run alongside
+    # loading (or training) it; the forecast and backtest then run side by side.
+    stages = [
+        # Serve a stored model when it is fresh, train one otherwise
+        Stage('model', lambda: load_or_train_model(ticker, days, callbacks=callbacks)),
+        Stage('info', lambda: fetch_company_info(ticker),
+              timeout=STAGE_TIMEOUTS['info'], fallback=EMPTY_INFO),
+        Stage('forecast', lambda _: predict_next_days(ticker, 30), deps=['model'],
+              timeout=STAGE_TIMEOUTS['forecast'], fallback=None),
+        Stage('backtest', backtest_stage, deps=['model'],
+              timeout=STAGE_TIMEOUTS['backtest'], fallback=(np.array([]), np.array([]), None)),
+    ]
+    if charts == 'inline':
+        stages += [
+            Stage('candlestick_chart', lambda: generate_candlestick_chart(fetch_stock_data(ticker), days),
+                  timeout=STAGE_TIMEOUTS['chart'], fallback=None),
+            Stage('next_30_days_chart', lambda forecast: generate_next_30_days_prediction_chart(forecast, ticker),
+                  deps=['forecast'], timeout=STAGE_TIMEOUTS['chart'], fallback=None),
+            Stage('one_year_comparison_chart',
+                  lambda backtest: generate_one_year_overlay_chart(*backtest[:2], ticker, num_days=len(backtest[0])),
+                  deps=['backtest'], timeout=STAGE_TIMEOUTS['chart'], fallback=None),
+        ]
+    run = run_stages(stages)
+
+    _, predictions, _, _, df = run['model']
+    predicted_prices = run['forecast']
+    one_year_actual, one_year_predicted, backtest_summary = run['backtest']
+
+    result = {
+        'predictions': predictions.tolist(),
+        'series': build_series(df, days, predicted_prices, one_year_actual, one_year_predicted),
+        'backtest': backtest_summary,
+        'info': run['info']
+    }
+    if charts == 'url':
+        # Images are rendered on first request to /api/chart and cached by content key
+        result['charts'] = chart_urls(ticker, days, df)
+    elif charts == 'inline':
+        for name in ('candlestick_chart', 'next_30_days_chart', 'one_year_comparison_chart'):
+            result[name] = run[name]
+    if run.failed:
+        # Stages that timed out or failed and were replaced by their fallback
+        result['partial'] = sorted(run.failed)
+    return result
 
 @app.route('/api/predict')
 def predict():
     ticker = request.args.get('ticker')
     days = request.args.get('days', default=30, type=int)
+    charts = request.args.get('charts', default='url')
     if not ticker:
         return jsonify({"error": "Ticker is required"}), 400
 
+    if charts not in CHART_MODES:
+        return jsonify(handle_error(f"charts must be one of {', '.join(CHART_MODES)}", 400)), 400
+
     if not is_valid_ticker(ticker):
         logger.error(f"Invalid ticker: {ticker}")
         return jsonify(handle_error("Invalid ticker symbol", 400)), 400
@@ -287,40 +449,135 @@ def predict():
         logger.error(f"Invalid prediction range: {days}")
         return jsonify(handle_error("Prediction range must be between 1 and 730 days", 400)), 400
 
+    ticker = ticker.upper().strip()
+    try:
+        fresh = has_fresh_model(ticker, days)
+    except ValueError:
+        # No data for this symbol; remember it so the next request fails fast
+        reject_ticker(ticker)
+        logger.error(f"Invalid ticker: {ticker}")
+        return jsonify(handle_error("Invalid ticker symbol", 400)), 400
+
     try:
-        # Train model and fetch data
-        close_prices, predictions, model, scaler, df = train_lstm_model(ticker, days, return_model=True)
+        if fresh:
+            return jsonify(build_prediction(ticker, days, charts))
 
-        # Ensure index is datetime
-        if not isinstance(df.index, pd.DatetimeIndex):
-            df.index = pd.to_datetime(df.index)
+        # Training takes far longer than a request should; hand it to the job
+        # queue and let the client poll /api/jobs/<id> for the result.
+        job = job_queue.submit((ticker, days, charts), build_prediction, ticker, days, charts)
+        return jsonify({'job_id': job['id'], 'status': job['status']}), 202
+    except Exception as e:
+        logger.error(f"Prediction error for {ticker}: {e}", exc_info=True)
+        return jsonify(handle_error("Failed to generate prediction", 500)), 500
 
-        # Generate charts
-        candlestick_chart = generate_candlestick_chart(df, days)
-        predicted_prices = predict_next_days(ticker, 30)
-        next_30_days_chart = generate_next_30_days_prediction_chart(predicted_prices, ticker)
+@app.route('/api/jobs/<string:job_id>')
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(handle_error("Unknown job id", 404)), 404
+
+    ticker, days, _ = job['key']
+    response = {
+        'job_id': job['id'],
+        'ticker': ticker,
+        'days': days,
+        'status': job['status'],
+        'progress': job['progress'],
+    }
+    if job['status'] == DONE:
+        response['result'] = job['result']
+    elif job['status'] == FAILED:
+        response['error'] = 'Failed to generate prediction'
+    return jsonify(response)
+
+@app.route('/api/chart/<string:kind>/<string:ticker>')
+def chart(kind, ticker):
+    days = request.args.get('days', default=30, type=int)
+    fmt = request.args.get('format', default='png')
+    dpi = min(max(request.args.get('dpi', default=CHART_DPI, type=int), 50), 200)
+    if kind not in CHART_KINDS:
+        return jsonify(handle_error(f"Unknown chart kind: {kind}", 404)), 404
+    if fmt not in CHART_FORMATS:
+        return jsonify(handle_error(f"format must be one of {', '.join(CHART_FORMATS)}", 400)), 400
+    if not is_valid_ticker(ticker):
+        return jsonify(handle_error("Invalid ticker symbol", 400)), 400
+    if not validate_prediction_days(days):
+        return jsonify(handle_error("Prediction range must be between 1 and 730 days", 400)), 400
 
-        one_year_data = close_prices[-365:] if len(close_prices) >= 365 else close_prices
-        one_year_chart = generate_one_year_overlay_chart(one_year_data, predictions[:len(one_year_data)], ticker)
+    ticker = ticker.upper().strip()
+    try:
+        df = fetch_stock_data(ticker)
+    except ValueError:
+        reject_ticker(ticker)
+        return jsonify(handle_error("Invalid ticker symbol", 400)), 400
 
-        # Fetch company info
-        info = fetch_company_info(ticker)
+    try:
+        key = chart_keys(ticker, days, df, fmt, dpi)[kind]
+        image = chart_cache.get(key, fmt)
+        metrics.count('chart', 'miss' if image is None else 'hit')
+        if image is None:
+            image = render_chart(kind, ticker, days, df, fmt, dpi)
+            chart_cache.put(key, image, fmt)
+    except FileNotFoundError:
+        return jsonify(handle_error("Model not trained for this ticker yet", 404)), 404
+    except Exception as e:
+        logger.error(f"Chart error for {kind}/{ticker}: {e}", exc_info=True)
+        return jsonify(handle_error("Failed to generate chart", 500)), 500
+
+    response = Response(image, mimetype=CHART_FORMATS[fmt])
+    response.set_etag(key)
+    response.cache_control.public = True
+    if request.args.get('v') == key:
+        # The URL names this exact content, so it never changes
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/backtest/<string:ticker>')
+def backtest(ticker):
+    days = request.args.get('days', type=int)
+    num_days = request.args.get('num_days', default=BACKTEST_DAYS, type=int)
+    if not is_valid_ticker(ticker):
+        return jsonify(handle_error("Invalid ticker symbol", 400)), 400
+    if days is not None and not validate_prediction_days(days):
+        return jsonify(handle_error("Prediction range must be between 1 and 730 days", 400)), 400
+    if not 1 <= num_days <= 730:
+        return jsonify(handle_error("num_days must be between 1 and 730", 400)), 400
 
-        return jsonify({
-            'predictions': predictions.tolist(),
-            'candlestick_chart': candlestick_chart,
-            'next_30_days_chart': next_30_days_chart,
-            'one_year_comparison_chart': one_year_chart,
-            'info': info
-        })
+    ticker = ticker.upper().strip()
+    try:
+        result = stored_backtest(ticker, days, num_days)
+    except FileNotFoundError:
+        return jsonify(handle_error("Model not trained for this ticker yet", 404)), 404
+    except ValueError as e:
+        return jsonify(handle_error(str(e), 400)), 400
     except Exception as e:
-        logger.error(f"Prediction error for {ticker}: {e}", exc_info=True)
-        return jsonify(handle_error("Failed to generate prediction", 500)), 500
+        logger.error(f"Backtest error for {ticker}: {e}", exc_info=True)
+        return jsonify(handle_error("Failed to run backtest", 500)), 500
+
+    # Results only change with the model or price data; let clients revalidate cheaply
+    response = jsonify(result)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def snapshot_response(data):
+    """
+    JSON response for market snapshot data with an ETag and a max-age matching the
+    snapshot refresh interval; answers 304 when the client already has this version.
+    """
+    response = jsonify(data)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = market_snapshot.refresh_seconds
+    return response.make_conditional(request)
 
 @app.route('/api/trending')
 def trending():
     try:
-        return jsonify(get_trending_stocks())
+        return snapshot_response(get_trending_stocks())
     except Exception as e:
         logger.error(f"Trending error: {e}", exc_info=True)
         return jsonify([]), 500
@@ -328,7 +585,7 @@ def trending():
 @app.route('/api/top_losers')
 def top_losers():
     try:
-        return jsonify(get_top_losers())
+        return snapshot_response(get_top_losers())
     except Exception as e:
         logger.error(f"Top losers error: {e}", exc_info=True)
         return jsonify([]), 500
@@ -336,10 +593,11 @@ def top_losers():
 @app.route('/api/search')
 def search():
     query = request.args.get('ticker', '').upper()
+    limit = request.args.get('limit', default=10, type=int)
     if not query:
         return jsonify([])
     try:
-        return jsonify(search_tickers(query))
+        return jsonify(search_tickers(query, min(max(limit, 1), 50)))
     except Exception as e:
         logger.error(f"Search error: {e}", exc_info=True)
         return jsonify([]), 500
@@ -0,0 +1,66 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+BACKTEST_DAYS = 365
+# Bars left out of the holdout model's training; the backtest scores these (and any
+# bar added since), so its metrics measure out-of-sample accuracy
+HOLDOUT_DAYS = int(os.environ.get('BACKTEST_HOLDOUT_DAYS', 120))
+BACKTEST_CACHE_SIZE = 256
+
+
+def backtest_metrics(actual, predicted, previous, in_sample: bool) -> dict:
+    """
+    Error metrics for one-step-ahead predictions.
+
+    :param actual: Closes that were predicted.
+    :param predicted: Model predictions for those closes.
+    :param previous: The close before each actual one (the last input the model saw).
+    :param in_sample: Whether the model was trained on these closes, in which case the
+                      metrics measure fit rather than out-of-sample accuracy.
+    :return: Dict with mae, rmse, mape (percent), directional_accuracy (percent), days
+             and in_sample.
+    """
+    actual = np.asarray(actual, dtype='float64')
+    predicted = np.asarray(predicted, dtype='float64')
+    previous = np.asarray(previous, dtype='float64')
+
+    error = predicted - actual
+    nonzero = actual != 0
+    hits = np.sign(predicted - previous) == np.sign(actual - previous)
+    return {
+        'days': int(len(actual)),
+        'mae': round(float(np.mean(np.abs(error))), 4),
+        'rmse': round(float(np.sqrt(np.mean(error ** 2))), 4),
+        'mape': round(float(np.mean(np.abs(error[nonzero] / actual[nonzero])) * 100), 4) if nonzero.any() else None,
+        'directional_accuracy': round(float(np.mean(hits)) * 100, 2),
+        'in_sample': in_sample,
+    }
+
+
+class BacktestCache:
+    """
+    Small LRU of backtest results. Keys carry the model version and the identity of
+    the price series, so a retrained model or a new bar is a miss.
+    """
+
+    def __init__(self, max_size: int = BACKTEST_CACHE_SIZE):
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
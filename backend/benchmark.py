@@ -0,0 +1,323 @@
+"""
+Offline benchmark of the prediction pipeline: times each stage on its own
+(price loading, windowing, model.fit, the recursive forecast, the backtest,
+every chart renderer, and the Flask endpoints through the test client) and
+reports p50/p95 latency, throughput and peak RSS.
+
+Run from the backend directory:
+
+    python benchmark.py                          # print the report
+    python benchmark.py --baseline benchmark_baseline.json
+                                                 # exit 1 if a stage regressed
+    python benchmark.py --write-baseline         # refresh the stored baseline
+    python benchmark.py --profile profiles       # also write cProfile stats for
+                                                 # the slowest stages
+
+Nothing touches the network: the bundled stock_data/*.csv and models/*.h5 are
+copied into a scratch directory, the benchmark runs there, and yfinance is
+replaced by a stub that reports no new bars. The bundled models carry no
+scaler, so the pipeline stages use a model trained once at the start of the
+run (timed as train_lstm_model / model_fit) and then loaded back from disk, as
+a freshly started API process would. With --epochs other than API_EPOCHS the
+timed training is followed by an untimed one with API_EPOCHS, so the endpoints
+find the model /api/predict expects instead of starting a training job.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import types
+import pstats
+import shutil
+import cProfile
+import platform
+import argparse
+import resource
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# A stage regresses when its p50 (or the peak RSS) grows by more than this
+# fraction of the baseline and by more than NOISE_MS.
+TOLERANCE = 0.25
+NOISE_MS = 1.0
+
+# Epochs of the model /api/predict serves (load_or_train_model's default)
+API_EPOCHS = 10
+
+# Stages profiled with --profile, slowest p50 first
+PROFILE_TOP = 5
+
+STUB_INFO = {
+    'shortName': 'Benchmark Inc.', 'sector': 'Technology', 'industry': 'Software',
+    'website': 'https://example.com', 'longBusinessSummary': 'Fixture company.', 'marketCap': 1_000_000_000,
+}
+
+
+def _stub_yfinance():
+    """Installs a yfinance module that never touches the network."""
+    import pandas as pd
+
+    class Ticker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+            self.info = dict(STUB_INFO)
+
+        def history(self, **kwargs):
+            return pd.DataFrame()
+
+    stub = types.ModuleType('yfinance')
+    stub.Ticker = Ticker
+    stub.download = lambda *args, **kwargs: pd.DataFrame()
+    sys.modules['yfinance'] = stub
+
+
+def _workspace() -> str:
+    """Scratch copy of the bundled prices and models, with the prices marked fresh."""
+    root = tempfile.mkdtemp(prefix='stockwave-bench-')
+    for sub, pattern in (('stock_data', '*.csv'), ('models', '*.h5')):
+        os.makedirs(os.path.join(root, sub))
+        for path in glob.glob(os.path.join(BACKEND_DIR, sub, pattern)):
+            target = os.path.join(root, sub, os.path.basename(path))
+            shutil.copy(path, target)
+            os.utime(target)
+    return root
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(samples_ms: list) -> dict:
+    samples = np.asarray(samples_ms)
+    return {
+        'runs': len(samples),
+        'p50_ms': round(float(np.percentile(samples, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples, 95)), 3),
+        'mean_ms': round(float(samples.mean()), 3),
+        'ops_per_s': round(1000 / float(samples.mean()), 2) if samples.mean() > 0 else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def measure(fn, runs: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def profile_stages(results: dict, calls: dict, directory: str, top: int = PROFILE_TOP) -> list[str]:
+    """
+    Runs each of the `top` slowest stages once more under cProfile and writes
+    <stage>.prof (for snakeviz or pstats) and <stage>.txt (the 25 functions with
+    the most cumulative time) to `directory`. Returns the profiled stage names.
+    cProfile only sees the calling thread: the api_* stages show time spent waiting
+    on the stage pool, and their parts are profiled as the component stages.
+    """
+    os.makedirs(directory, exist_ok=True)
+    slowest = sorted(calls, key=lambda name: results[name]['p50_ms'], reverse=True)[:top]
+    for name in slowest:
+        profiler = cProfile.Profile()
+        profiler.runcall(calls[name])
+        profiler.dump_stats(os.path.join(directory, f'{name}.prof'))
+        with open(os.path.join(directory, f'{name}.txt'), 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(25)
+        print(f"  profiled {name:<19} -> {os.path.join(directory, name)}.prof", file=sys.stderr)
+    return slowest
+
+
+def _fit_timer():
+    """Keras callback that records how long model.fit ran, excluding setup and saving."""
+    from keras.callbacks import Callback
+
+    class FitTimer(Callback):
+        seconds = None
+
+        def on_train_begin(self, logs=None):
+            self._start = time.perf_counter()
+
+        def on_train_end(self, logs=None):
+            FitTimer.seconds = time.perf_counter() - self._start
+
+    return FitTimer()
+
+
+def run_suite(ticker: str, runs: int, epochs: int, profile_dir: str = None) -> dict:
+    """
+    Runs every stage and returns {stage: summary}. Expects to run inside the workspace.
+    With profile_dir, the slowest repeated stages are then profiled (training runs once
+    and is not).
+    """
+    import pandas as pd
+    import model
+    import charts
+    import price_cache
+    from windows import sliding_windows, WINDOW_SIZE
+    from forecast import recursive_forecast
+
+    results = {}
+    calls = {}
+
+    def stage(name, fn, stage_runs=runs, warmup=1):
+        calls[name] = fn
+        results[name] = measure(fn, stage_runs, warmup)
+        print(f"  {name:<28} p50 {results[name]['p50_ms']:>10.2f} ms", file=sys.stderr)
+
+    csv_path = os.path.join('stock_data', f"{model.sanitize_ticker_for_filename(ticker)}_2y.csv")
+    stage('csv_load', lambda: price_cache.normalize_index(pd.read_csv(csv_path, index_col=0, parse_dates=True)))
+    df = price_cache.fetch_stock_data(ticker)
+    stage('price_cache_read', lambda: price_cache.fetch_stock_data(ticker))
+    stage('close_prices_read', lambda: price_cache.fetch_close_prices(ticker))
+
+    from sklearn.preprocessing import MinMaxScaler
+    scaled = MinMaxScaler().fit_transform(df['Close'].to_numpy().reshape(-1, 1))
+    stage('windowing', lambda: np.ascontiguousarray(sliding_windows(scaled, WINDOW_SIZE, 1)[0]))
+
+    bundled = os.path.join('models', f"{model.sanitize_ticker_for_filename(ticker)}_lstm_model.h5")
+    if os.path.exists(bundled):
+        from keras.models import load_model
+        stage('keras_load_h5', lambda: load_model(bundled), stage_runs=min(runs, 5))
+
+    timer = _fit_timer()
+    start = time.perf_counter()
+    model.train_lstm_model(ticker, 30, epochs, df=df, callbacks=[timer], warm_start=False)
+    results['train_lstm_model'] = summarize([(time.perf_counter() - start) * 1000])
+    results['model_fit'] = summarize([timer.seconds * 1000])
+    for name in ('train_lstm_model', 'model_fit'):
+        print(f"  {name:<28} p50 {results[name]['p50_ms']:>10.2f} ms", file=sys.stderr)
+    if epochs != API_EPOCHS:
+        model.train_lstm_model(ticker, 30, API_EPOCHS, df=df, warm_start=False)
+
+    # Serve from disk like a freshly started API process, not the Keras model left by training.
+    model.model_cache.invalidate()
+    meta = model.stored_model_meta(ticker, 30)
+    lstm, scaler = model.model_cache.get(meta['paths']['model'], meta['paths']['scaler'])
+    close = df['Close'].to_numpy()
+    last_60 = scaler.transform(close[-WINDOW_SIZE:].reshape(-1, 1))
+    stage('recursive_forecast', lambda: recursive_forecast(lstm, last_60, scaler, 30))
+    stage('backtest_predictions', lambda: model.backtest_predictions(lstm, scaler, close))
+
+    forecast = recursive_forecast(lstm, last_60, scaler, 30)
+    actual, predicted = model.backtest_predictions(lstm, scaler, close)
+    stage('render_candlestick', lambda: charts.render_candlestick_chart(df, 30))
+    stage('render_next_30_days', lambda: charts.render_next_30_days_prediction_chart(forecast, ticker))
+    stage('render_overlay', lambda: charts.render_one_year_overlay_chart(actual, predicted, ticker, len(actual)))
+
+    import app
+    client = app.app.test_client()
+
+    def get(url):
+        def call():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url} returned {response.status_code}")
+        return call
+
+    stage('api_predict', get(f'/api/predict?ticker={ticker}&days=30'))
+    stage('api_predict_inline', get(f'/api/predict?ticker={ticker}&days=30&charts=inline'), stage_runs=max(3, runs // 4))
+    stage('api_chart_candlestick', get(f'/api/chart/candlestick/{ticker}?days=30'))
+    stage('api_backtest', get(f'/api/backtest/{ticker}'))
+    stage('api_search', get('/api/search?ticker=AA'))
+    stage('api_trending', get('/api/trending'))
+    if profile_dir:
+        profile_stages(results, calls, profile_dir)
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float = TOLERANCE) -> list[dict]:
+    """Stages whose p50 or peak RSS grew beyond the tolerance, with both values."""
+    regressions = []
+    for name, now in current['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if before is None:
+            continue
+        if now['p50_ms'] > before['p50_ms'] * (1 + tolerance) and now['p50_ms'] - before['p50_ms'] > NOISE_MS:
+            regressions.append({'stage': name, 'metric': 'p50_ms', 'baseline': before['p50_ms'], 'current': now['p50_ms']})
+    if current['peak_rss_mb'] > baseline.get('peak_rss_mb', float('inf')) * (1 + tolerance):
+        regressions.append({'stage': 'process', 'metric': 'peak_rss_mb',
+                            'baseline': baseline['peak_rss_mb'], 'current': current['peak_rss_mb']})
+    return regressions
+
+
+def render(result: dict, baseline: dict = None) -> str:
+    lines = [
+        f"Benchmark: {result['ticker']}, {result['runs']} runs per stage, {result['epochs']} epochs, "
+        f"Python {result['python']} ({result['platform']})",
+        '',
+        f"{'stage':<24} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>9} {'rss MB':>8} {'vs base':>8}",
+    ]
+    for name, s in result['stages'].items():
+        before = (baseline or {}).get('stages', {}).get(name)
+        delta = f"{(s['p50_ms'] / before['p50_ms'] - 1) * 100:+.0f}%" if before and before['p50_ms'] else ''
+        lines.append(f"{name:<24} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['ops_per_s'] or 0:>9.1f} "
+                     f"{s['peak_rss_mb']:>8.0f} {delta:>8}")
+    lines += ['', f"Peak RSS: {result['peak_rss_mb']:.0f} MB"]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the prediction pipeline offline.')
+    parser.add_argument('--ticker', default='AAPL', help='Bundled ticker to benchmark')
+    parser.add_argument('--runs', type=int, default=20, help='Timed runs per stage (training runs once)')
+    parser.add_argument('--epochs', type=int, default=API_EPOCHS, help=f'Epochs of the timed training; the endpoints always use a {API_EPOCHS}-epoch model')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against; exit 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='Allowed slowdown as a fraction')
+    parser.add_argument('--write-baseline', action='store_true', help=f'Write the results to {BASELINE_PATH}')
+    parser.add_argument('--output', help='Also write the results as JSON to this path')
+    parser.add_argument('--profile', metavar='DIR',
+                        help=f'Write cProfile stats for the {PROFILE_TOP} slowest stages to DIR')
+    args = parser.parse_args(argv)
+    profile_dir = os.path.abspath(args.profile) if args.profile else None
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    _stub_yfinance()
+    workspace = _workspace()
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        stages = run_suite(args.ticker.upper(), args.runs, args.epochs, profile_dir)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    result = {
+        'generated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': platform.python_version(),
+        'platform': f"{platform.system()} {platform.machine()}",
+        'ticker': args.ticker.upper(),
+        'runs': args.runs,
+        'epochs': args.epochs,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'stages': stages,
+    }
+    print(render(result, baseline))
+    for path in filter(None, [args.output, BASELINE_PATH if args.write_baseline else None]):
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+
+    if baseline is not None:
+        regressions = compare(result, baseline, args.tolerance)
+        for r in regressions:
+            print(f"Regression in {r['stage']}: {r['metric']} {r['baseline']} -> {r['current']}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
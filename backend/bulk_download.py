@@ -0,0 +1,207 @@
+"""
+Bulk price-history refresh for a whole ticker universe: tickers are grouped into
+multi-symbol downloads, a few chunks run at a time under a shared rate limit,
+failed chunks are retried with exponential backoff, and each symbol's bars are
+written to the usual stock_data/ cache entry, so fetch_stock_data() finds them
+fresh afterwards.
+
+Run from the backend directory, e.g. before train_all.py on a cold machine:
+
+    python bulk_download.py --universe sp500 --period 2y --chunk-size 50 --workers 4
+    python bulk_download.py AAPL AMZN SBIN.NS --force
+    python bulk_download.py --universe sp500 --fixtures ../fixtures/prices
+
+Entries that are still fresh are skipped unless --force is given. --fixtures
+reads <TICKER>_<period>.csv files from a directory instead of calling Yahoo.
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from metrics import yfinance_call
+from price_cache import normalize_ticker, normalize_index, cache_path, is_fresh, store_history
+
+logger = logging.getLogger('stockwave')
+
+CHUNK_SIZE = 50
+WORKERS = 4
+RETRIES = 3
+BACKOFF_SECONDS = 2.0
+# Chunk downloads started per second across all workers
+RATE_LIMIT = 1.0
+
+
+class YahooProvider:
+    """Downloads a chunk of symbols with one yf.download call."""
+
+    def __call__(self, symbols: list[str], period: str) -> dict:
+        import yfinance as yf
+
+        frame = yfinance_call(
+            'bulk_download',
+            yf.download,
+            tickers=' '.join(symbols),
+            period=period,
+            interval='1d',
+            group_by='ticker',
+            auto_adjust=True,
+            actions=True,
+            threads=True,
+            progress=False,
+        )
+        if not isinstance(frame.columns, pd.MultiIndex):
+            return {symbols[0]: frame} if len(symbols) == 1 else {}
+        return {symbol: frame[symbol] for symbol in symbols if symbol in frame.columns.get_level_values(0)}
+
+
+class FixtureProvider:
+    """Serves histories from <directory>/<TICKER>_<period>.csv, for offline runs."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def __call__(self, symbols: list[str], period: str) -> dict:
+        histories = {}
+        for symbol in symbols:
+            path = os.path.join(self.directory, os.path.basename(cache_path(symbol, period)))
+            if os.path.exists(path):
+                histories[symbol] = pd.read_csv(path, index_col=0, parse_dates=True)
+        return histories
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _download_chunk(provider, symbols, period, limiter, retries, backoff) -> dict:
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return provider(symbols, period)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+            logger.warning(f"Chunk of {len(symbols)} ({symbols[0]}...) failed: {e}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _store(symbol: str, period: str, history) -> bool:
+    if history is None:
+        return False
+    history = history.dropna(how='all')
+    if history.empty or 'Close' not in history.columns:
+        return False
+    history = normalize_index(history.copy())
+    store_history(history, cache_path(symbol, period))
+    return True
+
+
+def bulk_refresh(tickers, period: str = '2y', provider=None, chunk_size: int = CHUNK_SIZE,
+                 workers: int = WORKERS, retries: int = RETRIES, backoff: float = BACKOFF_SECONDS,
+                 rate: float = RATE_LIMIT, force: bool = False) -> dict:
+    """
+    Refreshes the cached history of every ticker that is missing or stale.
+
+    :param provider: callable(symbols, period) -> {symbol: OHLCV DataFrame}; Yahoo by default.
+    :return: Report with the symbols that were stored, skipped as fresh, missing from
+             the provider's answer, or failed: malformed, or in chunks that failed
+             after all retries.
+    """
+    provider = provider or YahooProvider()
+    report = {'stored': [], 'fresh': [], 'missing': [], 'failed': []}
+    symbols = []
+    for ticker in tickers:
+        try:
+            symbols.append(normalize_ticker(ticker))
+        except ValueError as e:
+            logger.error(str(e))
+            report['failed'].append(ticker)
+    symbols = list(dict.fromkeys(symbols))
+    due = []
+    for symbol in symbols:
+        if not force and is_fresh(cache_path(symbol, period), period):
+            report['fresh'].append(symbol)
+        else:
+            due.append(symbol)
+
+    chunks = [due[i:i + chunk_size] for i in range(0, len(due), max(1, chunk_size))]
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(_download_chunk, provider, chunk, period, limiter, retries, backoff): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                histories = future.result()
+            except Exception as e:
+                logger.error(f"Giving up on {len(chunk)} symbols ({chunk[0]}...): {e}")
+                report['failed'] += chunk
+                continue
+            for symbol in chunk:
+                try:
+                    stored = _store(symbol, period, histories.get(symbol))
+                except Exception as e:
+                    logger.error(f"Could not cache {symbol}: {e}")
+                    stored = False
+                report['stored' if stored else 'missing'].append(symbol)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Download price histories for many tickers into the cache.')
+    parser.add_argument('tickers', nargs='*', help='Ticker symbols (Indian stocks with their .NS suffix)')
+    parser.add_argument('--universe', choices=['sp500'], help='Refresh a whole ticker universe')
+    parser.add_argument('--period', default='2y', help='History period, as for fetch_stock_data')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Symbols per download')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Chunks downloaded concurrently')
+    parser.add_argument('--rate', type=float, default=RATE_LIMIT, help='Chunk downloads started per second')
+    parser.add_argument('--retries', type=int, default=RETRIES, help='Retries per chunk')
+    parser.add_argument('--force', action='store_true', help='Refresh entries that are still fresh')
+    parser.add_argument('--fixtures', help='Read <TICKER>_<period>.csv files from this directory instead of Yahoo')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    tickers = list(args.tickers)
+    if args.universe == 'sp500':
+        from symbols import get_symbol_index
+        tickers += get_symbol_index().symbols()
+    if not tickers:
+        parser.error('give tickers or --universe')
+
+    provider = FixtureProvider(args.fixtures) if args.fixtures else YahooProvider()
+    start = time.perf_counter()
+    report = bulk_refresh(tickers, args.period, provider, args.chunk_size, args.workers,
+                          args.retries, rate=args.rate, force=args.force)
+    print(f"{len(tickers)} tickers in {time.perf_counter() - start:.1f}s: {len(report['stored'])} stored, "
+          f"{len(report['fresh'])} fresh, {len(report['missing'])} missing, {len(report['failed'])} failed")
+    for key in ('missing', 'failed'):
+        if report[key]:
+            print(f"{key}: {' '.join(sorted(report[key]))}")
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
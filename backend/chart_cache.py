@@ -0,0 +1,61 @@
+import os
+import hashlib
+import tempfile
+import threading
+
+CHART_CACHE_DIR = os.environ.get('CHART_CACHE_DIR', 'chart_cache')
+CHART_CACHE_MAX_FILES = int(os.environ.get('CHART_CACHE_MAX_FILES', 2000))
+
+# Chart kinds served by /api/chart/<kind>/<ticker>
+CHART_KINDS = ('candlestick', 'next30', 'overlay')
+
+
+def chart_key(kind: str, ticker: str, days: int, *versions) -> str:
+    """
+    Content address of a chart: it only changes when the inputs it is drawn from
+    (price data version, model version) change, so it can be cached forever.
+    """
+    raw = '|'.join([kind, ticker.upper(), str(days), *[str(v) for v in versions]])
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+class ChartCache:
+    """
+    Rendered chart images on disk, one file per content key. Keeps at most
+    `max_files` images and drops the least recently written ones beyond that.
+    """
+
+    def __init__(self, directory: str = CHART_CACHE_DIR, max_files: int = CHART_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def get(self, key: str, ext: str = 'png'):
+        try:
+            with open(self._path(key, ext), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, image: bytes, ext: str = 'png'):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(image)
+        os.replace(tmp_path, self._path(key, ext))
+        self._prune()
+
+    def _prune(self):
+        with self._lock:
+            entries = [e for e in os.scandir(self.directory) if not e.name.endswith('.tmp')]
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_files]:
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
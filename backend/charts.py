@@ -1,16 +1,120 @@
+import os
 import base64
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend for server environments
-import matplotlib.pyplot as plt
-import mplfinance as mpf
+import threading
 from io import BytesIO
 
-def generate_candlestick_chart(data, prediction_days=30):
+import numpy as np
+
+from metrics import timed
+
+# Charts are drawn with the object-oriented Figure + Agg canvas API rather than
+# pyplot, whose global "current figure" state is shared by every request thread.
+# Each thread keeps one prebuilt figure per chart kind and only swaps the data,
+# titles and limits on it, so axes, fonts and legends are not rebuilt per request.
+# matplotlib itself is only imported when a thread builds its first figure.
+
+CHART_DPI = int(os.environ.get('CHART_DPI', 100))
+CHART_FORMATS = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml',
+}
+
+# Colors of mplfinance's 'yahoo' style, which the candlestick chart used to be drawn with
+CANDLE_UP = '#00b060'
+CANDLE_DOWN = '#fe3032'
+CANDLE_WICK = '#606060'
+
+_pool = threading.local()
+
+
+def _new_figure(**kwargs):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _build_candlestick():
+    fig = _new_figure(figsize=(6, 3))
+    ax = fig.add_subplot()
+    ax.set_facecolor('#fafafa')
+    ax.grid(True, color='#d0d0d0', linestyle='-', linewidth=0.5)
+    ax.set_axisbelow(True)
+    ax.yaxis.tick_right()
+    ax.yaxis.set_label_position('right')
+    ax.set_ylabel('Price')
+    title = ax.set_title('')
+    return {'fig': fig, 'ax': ax, 'title': title, 'artists': []}
+
+
+def _build_next_30_days():
+    fig = _new_figure(figsize=(10, 4))
+    ax = fig.add_subplot()
+    line, = ax.plot([], [], color='green', marker='o', linestyle='-', linewidth=2, label='Predicted Price')
+    title = ax.set_title('', fontsize=14)
+    ax.set_xlabel('Day', fontsize=12)
+    ax.set_ylabel('Price (USD)', fontsize=12)
+    ax.set_xticks(range(1, 31, 2))
+    ax.set_xlim(0, 31)
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.legend()
+    return {'fig': fig, 'ax': ax, 'title': title, 'line': line}
+
+
+def _build_overlay():
+    fig = _new_figure(figsize=(12, 6), layout='tight')
+    ax = fig.add_subplot()
+    actual, = ax.plot([], [], label='Actual Prices', color='blue', linestyle='-', linewidth=2)
+    predicted, = ax.plot([], [], label='Predicted Prices', color='orange', linestyle='-', linewidth=2)
+    title = ax.set_title('', fontsize=16)
+    ax.set_xlabel('Days', fontsize=14)
+    ax.set_ylabel('Price (USD)', fontsize=14)
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.7)
+    return {'fig': fig, 'ax': ax, 'title': title, 'actual': actual, 'predicted': predicted}
+
+
+_BUILDERS = {
+    'candlestick': _build_candlestick,
+    'next30': _build_next_30_days,
+    'overlay': _build_overlay,
+}
+
+
+def _figure(kind: str) -> dict:
+    """Returns this thread's prebuilt figure for a chart kind, building it on first use."""
+    figures = getattr(_pool, 'figures', None)
+    if figures is None:
+        figures = _pool.figures = {}
+    if kind not in figures:
+        figures[kind] = _BUILDERS[kind]()
+    return figures[kind]
+
+
+def _encode(fig, fmt: str, dpi: int) -> bytes:
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format: {fmt}")
+    buf = BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi)
+    return buf.getvalue()
+
+
+def _autoscale(ax):
+    ax.relim()
+    ax.autoscale_view()
+
+
+@timed('chart_candlestick')
+def render_candlestick_chart(data, prediction_days=30, fmt='png', dpi=CHART_DPI):
     """
-    Generates a base64-encoded PNG candlestick chart for the last 'prediction_days' days.
+    Renders a candlestick chart for the last 'prediction_days' days.
     :param data: Pandas DataFrame with stock OHLC data.
     :param prediction_days: Number of days to show on the chart.
-    :return: base64-encoded PNG image string or None on error.
+    :param fmt: Image format, one of CHART_FORMATS.
+    :param dpi: Output resolution.
+    :return: Encoded image bytes or None on error.
     """
     if data.empty:
         print("Error: Data is empty.")
@@ -21,64 +125,64 @@ def generate_candlestick_chart(data, prediction_days=30):
         print("Error: Insufficient data for candlestick chart.")
         return None
 
-    df.index.name = 'Date'
-    fig, _ = mpf.plot(
-        df,
-        type='candle',
-        returnfig=True,
-        figsize=(6, 3),
-        title=f"Candlestick Chart - Last {prediction_days} Days",
-        style='yahoo'
-    )
-    buf = BytesIO()
-    fig.savefig(buf, format='png')
-    plt.close(fig)
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode('utf-8')
-    return encoded
-
-
-
-def generate_next_30_days_prediction_chart(predicted, ticker):
+    chart = _figure('candlestick')
+    ax = chart['ax']
+    for artist in chart['artists']:
+        artist.remove()
+
+    x = np.arange(len(df))
+    opens, highs, lows, closes = (df[col].to_numpy(dtype='float64') for col in ('Open', 'High', 'Low', 'Close'))
+    colors = np.where(closes >= opens, CANDLE_UP, CANDLE_DOWN)
+    width = 0.6 if len(df) > 1 else 0.3
+    chart['artists'] = [
+        ax.vlines(x, lows, highs, colors=CANDLE_WICK, linewidth=0.8),
+        ax.bar(x, np.abs(closes - opens), width=width, bottom=np.minimum(opens, closes),
+               color=colors, edgecolor=colors, alpha=0.9),
+    ]
+
+    ticks = np.unique(np.linspace(0, len(df) - 1, num=min(len(df), 6)).astype(int))
+    ax.set_xticks(ticks)
+    ax.set_xticklabels(df.index[ticks].strftime('%b %d'), rotation=30, ha='right', fontsize=8)
+    ax.set_xlim(-1, len(df))
+    spread = max(highs.max() - lows.min(), 1e-9)
+    ax.set_ylim(lows.min() - 0.05 * spread, highs.max() + 0.05 * spread)
+    chart['title'].set_text(f"Candlestick Chart - Last {prediction_days} Days")
+    return _encode(chart['fig'], fmt, dpi)
+
+
+@timed('chart_next30')
+def render_next_30_days_prediction_chart(predicted, ticker, fmt='png', dpi=CHART_DPI):
     """
-    Generates a base64-encoded PNG line chart for the next 30 days predicted stock prices.
+    Renders a line chart for the next 30 days predicted stock prices.
     :param predicted: List or array of predicted prices (must be at least 30 elements).
     :param ticker: Stock ticker symbol string.
-    :return: base64-encoded PNG image string or None on error.
+    :return: Encoded image bytes or None on error.
     """
     if predicted is None or len(predicted) < 30:
         print("Error: Predicted data must contain at least 30 values.")
         return None
 
-    next_30 = predicted[:30]
-
-    plt.figure(figsize=(10, 4))
-    plt.plot(range(1, 31), next_30, color='green', marker='o', linestyle='-', linewidth=2, label='Predicted Price')
-    plt.title(f'{ticker} - Next 30 Days Price Prediction', fontsize=14)
-    plt.xlabel('Day', fontsize=12)
-    plt.ylabel('Price (USD)', fontsize=12)
-    plt.xticks(range(1, 31, 2))
-    plt.grid(True, linestyle='--', alpha=0.6)
-    plt.legend()
+    chart = _figure('next30')
+    chart['line'].set_data(range(1, 31), predicted[:30])
+    chart['title'].set_text(f'{ticker} - Next 30 Days Price Prediction')
+    ax = chart['ax']
+    _autoscale(ax)
+    ax.set_xlim(0, 31)
+    return _encode(chart['fig'], fmt, dpi)
 
-    buf = BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode('utf-8')
-    return encoded
 
-def generate_one_year_overlay_chart(actual, predicted, ticker, num_days=365):
+@timed('chart_overlay')
+def render_one_year_overlay_chart(actual, predicted, ticker, num_days=365, fmt='png', dpi=CHART_DPI):
     """
-    Generates a base64-encoded PNG overlay chart comparing actual prices with predictions
-    over a user-specified number of days.
+    Renders an overlay chart comparing actual prices with predictions over a
+    user-specified number of days.
     If predicted data is shorter than num_days, pads with last predicted value.
 
     :param actual: List or array of historical prices (must be at least num_days).
     :param predicted: List or array of predicted prices.
     :param ticker: Stock ticker symbol string.
     :param num_days: Number of days to plot (default 365).
-    :return: base64-encoded PNG image string or None on error.
+    :return: Encoded image bytes or None on error.
     """
     if actual is None or len(actual) < num_days:
         print(f"Error: Insufficient actual data for {num_days} days.")
@@ -98,19 +202,28 @@ def generate_one_year_overlay_chart(actual, predicted, ticker, num_days=365):
         print("Error: Predicted data length mismatch after padding.")
         return None
 
-    plt.figure(figsize=(12, 6))
-    plt.plot(trimmed_actual, label='Actual Prices', color='blue', linestyle='-', linewidth=2)
-    plt.plot(predicted, label='Predicted Prices', color='orange', linestyle='-', linewidth=2)
-    plt.title(f'{ticker} - Last {num_days} Days Actual vs Predicted', fontsize=16)
-    plt.xlabel('Days', fontsize=14)
-    plt.ylabel('Price (USD)', fontsize=14)
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
+    chart = _figure('overlay')
+    chart['actual'].set_data(range(num_days), trimmed_actual)
+    chart['predicted'].set_data(range(num_days), predicted)
+    chart['title'].set_text(f'{ticker} - Last {num_days} Days Actual vs Predicted')
+    _autoscale(chart['ax'])
+    return _encode(chart['fig'], fmt, dpi)
 
-    buf = BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode('utf-8')
-    return encoded
+
+def _b64(image):
+    return base64.b64encode(image).decode('utf-8') if image else None
+
+
+def generate_candlestick_chart(data, prediction_days=30):
+    """Base64-encoded PNG version of render_candlestick_chart(), or None on error."""
+    return _b64(render_candlestick_chart(data, prediction_days))
+
+
+def generate_next_30_days_prediction_chart(predicted, ticker):
+    """Base64-encoded PNG version of render_next_30_days_prediction_chart(), or None on error."""
+    return _b64(render_next_30_days_prediction_chart(predicted, ticker))
+
+
+def generate_one_year_overlay_chart(actual, predicted, ticker, num_days=365):
+    """Base64-encoded PNG version of render_one_year_overlay_chart(), or None on error."""
+    return _b64(render_one_year_overlay_chart(actual, predicted, ticker, num_days))
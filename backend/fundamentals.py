@@ -0,0 +1,212 @@
+"""
+Persistent cache of company fundamentals (name, sector, market cap, ...) so
+/api/predict does not wait on yfinance's `Ticker.info`, one of its slowest calls.
+
+Each field is stored in SQLite with the time it was fetched and served for its
+own TTL: descriptive fields for weeks, market cap for a day. Once a field is
+past its TTL the stored value is still returned and a background refresh is
+started (stale-while-revalidate); only a ticker with no stored fields waits on
+the download.
+
+Warm the store for a universe ahead of traffic, from the backend directory:
+
+    python fundamentals.py --universe sp500 --workers 8
+    python fundamentals.py AAPL MSFT SBIN.NS --force
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from price_cache import DATA_DIR
+from metrics import count, yfinance_call
+
+logger = logging.getLogger('stockwave')
+
+DB_PATH = os.environ.get('FUNDAMENTALS_DB', os.path.join(DATA_DIR, 'fundamentals.sqlite'))
+
+DAY = 24 * 60 * 60
+
+# Response field -> (key in yfinance's info dict, seconds before it is refreshed)
+FIELDS = {
+    'name': ('shortName', 30 * DAY),
+    'sector': ('sector', 30 * DAY),
+    'industry': ('industry', 30 * DAY),
+    'website': ('website', 30 * DAY),
+    'description': ('longBusinessSummary', 30 * DAY),
+    'marketCap': ('marketCap', DAY),
+}
+
+MISSING = 'N/A'
+
+# After a failed download the ticker is not retried for this long.
+RETRY_AFTER = 5 * 60
+
+PREFETCH_WORKERS = 8
+
+
+def _download_info(ticker: str) -> dict:
+    import yfinance as yf
+    return yfinance_call('info', lambda: yf.Ticker(ticker).info) or {}
+
+
+class FundamentalsStore:
+    """
+    SQLite-backed fundamentals keyed by (ticker, field). Reads never block on the
+    network once a ticker has been seen; stale fields are refreshed in the
+    background, at most one refresh per ticker at a time.
+    """
+
+    def __init__(self, path: str = DB_PATH, fields: dict = FIELDS, download=_download_info):
+        self.path = path
+        self.fields = fields
+        self._download = download
+        self._local = threading.local()
+        self._refreshing = set()
+        self._failed = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS fundamentals ("
+                " ticker TEXT NOT NULL, field TEXT NOT NULL, value TEXT, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (ticker, field))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=10)
+            db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def _read(self, ticker: str) -> dict:
+        rows = self._connection().execute(
+            'SELECT field, value, fetched_at FROM fundamentals WHERE ticker = ?', (ticker,)
+        ).fetchall()
+        return {field: (json.loads(value), fetched_at) for field, value, fetched_at in rows}
+
+    def _write(self, ticker: str, info: dict):
+        now = time.time()
+        rows = [(ticker, field, json.dumps(info.get(key, MISSING)), now)
+                for field, (key, _) in self.fields.items()]
+        with self._connection() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO fundamentals (ticker, field, value, fetched_at) VALUES (?, ?, ?, ?)',
+                rows,
+            )
+
+    def stale_fields(self, ticker: str, stored: dict = None, now: float = None) -> list[str]:
+        """Fields that are missing or older than their TTL."""
+        stored = self._read(ticker) if stored is None else stored
+        now = time.time() if now is None else now
+        return [field for field, (_, ttl) in self.fields.items()
+                if field not in stored or now - stored[field][1] > ttl]
+
+    def refresh(self, ticker: str) -> bool:
+        """Downloads every field for the ticker and stores it. Returns False on failure."""
+        if time.time() - self._failed.get(ticker, 0) < RETRY_AFTER:
+            return False
+        try:
+            info = self._download(ticker)
+            if not info:
+                # Yahoo answers transient failures with an empty info dict; storing it
+                # would serve N/A for every field until its TTL runs out.
+                raise ValueError("empty info")
+        except Exception as e:
+            self._failed[ticker] = time.time()
+            logger.warning(f"Fundamentals download failed for {ticker}: {e}")
+            return False
+        self._failed.pop(ticker, None)
+        self._write(ticker, info)
+        return True
+
+    def _refresh_in_background(self, ticker: str):
+        with self._lock:
+            if ticker in self._refreshing:
+                return
+            self._refreshing.add(ticker)
+
+        def run():
+            try:
+                self.refresh(ticker)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(ticker)
+
+        threading.Thread(target=run, name=f'fundamentals-{ticker}', daemon=True).start()
+
+    def get(self, ticker: str) -> dict:
+        """
+        Returns every field for the ticker, MISSING where unknown. Downloads inline
+        only when nothing is stored; stale fields are served and refreshed behind.
+        """
+        stored = self._read(ticker)
+        if not stored:
+            count('fundamentals', 'miss')
+            self.refresh(ticker)
+            stored = self._read(ticker)
+        elif self.stale_fields(ticker, stored):
+            count('fundamentals', 'stale')
+            self._refresh_in_background(ticker)
+        else:
+            count('fundamentals', 'hit')
+        return {field: stored[field][0] if field in stored else MISSING for field in self.fields}
+
+    def prefetch(self, tickers, workers: int = PREFETCH_WORKERS, force: bool = False) -> dict:
+        """
+        Refreshes every ticker with stale or missing fields (all of them with
+        force=True) on a thread pool. Returns counts of refreshed, fresh and failed.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        due = tickers if force else [t for t in tickers if self.stale_fields(t)]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(self.refresh, due))
+        refreshed = sum(results)
+        return {'refreshed': refreshed, 'fresh': len(tickers) - len(due), 'failed': len(due) - refreshed}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> FundamentalsStore:
+    """Returns the process-wide store, opening the database on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FundamentalsStore()
+    return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prefetch company fundamentals into the local store.')
+    parser.add_argument('tickers', nargs='*', help='Ticker symbols (Indian stocks with their .NS suffix)')
+    parser.add_argument('--universe', choices=['sp500'], help='Prefetch a whole ticker universe')
+    parser.add_argument('--workers', type=int, default=PREFETCH_WORKERS, help='Concurrent downloads')
+    parser.add_argument('--force', action='store_true', help='Refresh tickers whose fields are still fresh')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    tickers = [t.upper().strip() for t in args.tickers]
+    if args.universe == 'sp500':
+        from symbols import get_symbol_index
+        tickers += get_symbol_index().symbols()
+    if not tickers:
+        parser.error('give tickers or --universe')
+
+    start = time.perf_counter()
+    counts = get_store().prefetch(tickers, args.workers, args.force)
+    print(f"{len(tickers)} tickers: {counts['refreshed']} refreshed, {counts['fresh']} fresh, "
+          f"{counts['failed']} failed in {time.perf_counter() - start:.1f}s")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
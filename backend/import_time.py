@@ -0,0 +1,126 @@
+"""
+Startup-time report for the API process: how long `import app` takes, how much
+memory it leaves resident, which top-level modules cost the most, and whether
+any of the heavy ML/plotting stacks were loaded eagerly.
+
+Run from the backend directory after changing imports:
+
+    python import_time.py                 # print the report
+    python import_time.py --write         # also refresh IMPORT_TIME.md
+    python import_time.py --check         # exit 1 if a heavy module is imported
+
+Each run imports `app` in a fresh interpreter with `-X importtime`, so nothing
+imported by this script leaks into the measurement.
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+REPORT_PATH = 'IMPORT_TIME.md'
+
+# Must stay out of the API process until a request actually needs them.
+HEAVY_MODULES = ('tensorflow', 'keras', 'sklearn', 'joblib', 'matplotlib', 'mplfinance', 'yfinance')
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': sorted(sys.modules),
+}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> list[tuple]:
+    """(cumulative_us, depth, module) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative), depth, name.strip()))
+    return rows
+
+
+def measure(module: str = 'app', runs: int = 3) -> dict:
+    """Imports `module` in `runs` fresh interpreters and keeps the fastest run."""
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='2')
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _PROBE.format(module=module)],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result['imports'] = _parse_importtime(proc.stderr)
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    loaded = set(best.pop('modules'))
+    best['heavy'] = [name for name in HEAVY_MODULES if name in loaded]
+    return best
+
+
+def top_level(imports: list[tuple], limit: int = 12) -> list[tuple]:
+    """The most expensive modules imported directly by the measured module (depth 1)."""
+    direct = [(us, name) for us, depth, name in imports if depth == 1]
+    return sorted(direct, reverse=True)[:limit]
+
+
+def render(result: dict, module: str = 'app') -> str:
+    lines = [
+        f"# Import-time report: `import {module}`",
+        '',
+        f"Generated by `python import_time.py --write` on "
+        f"{datetime.now(timezone.utc).strftime('%Y-%m-%d')}, Python {platform.python_version()} "
+        f"({platform.system()} {platform.machine()}). Fastest of several cold runs.",
+        '',
+        f"- Wall time: {result['seconds']:.2f} s",
+        f"- Peak RSS: {result['max_rss_kb'] / 1024:.0f} MB",
+        f"- Heavy modules loaded at import: {', '.join(result['heavy']) or 'none'}",
+        '',
+        '| Module | Cumulative (ms) |',
+        '|---|---:|',
+    ]
+    for us, name in top_level(result['imports']):
+        lines.append(f"| {name} | {us / 1000:.1f} |")
+    lines += [
+        '',
+        'TensorFlow/Keras, scikit-learn and joblib load on the first training or model',
+        'load; matplotlib on the first chart render; yfinance on the first download.',
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the startup cost of the API process.')
+    parser.add_argument('--module', default='app', help='Module to import')
+    parser.add_argument('--runs', type=int, default=3, help='Cold imports to run; the fastest is reported')
+    parser.add_argument('--write', action='store_true', help=f'Write the report to {REPORT_PATH}')
+    parser.add_argument('--check', action='store_true', help='Fail if a heavy module is imported eagerly')
+    args = parser.parse_args(argv)
+
+    result = measure(args.module, args.runs)
+    report = render(result, args.module)
+    print(report)
+    if args.write:
+        with open(REPORT_PATH, 'w') as f:
+            f.write(report)
+    if args.check and result['heavy']:
+        print(f"Heavy modules imported at startup: {', '.join(result['heavy'])}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
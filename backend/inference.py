@@ -0,0 +1,407 @@
+"""
+Local inference server: a small pool of processes that own the loaded LSTMs and
+run forward passes for the web workers, so each Flask worker no longer carries
+its own TensorFlow runtime.
+
+Start it next to the API, from the backend directory:
+
+    python inference.py --socket /tmp/stockwave-inference.sock --workers 2 --threads 2
+
+and point the web workers at it with INFERENCE_SOCKET=/tmp/stockwave-inference.sock.
+Without INFERENCE_SOCKET the web workers load models in-process as before.
+
+Web workers connect over a Unix socket. The server shards requests across its
+worker processes by model file, so each model is loaded in exactly one process.
+Each worker merges the requests that arrive within --batch-ms into one forward
+call per model architecture: NumPy exports of the same shape (every ticker's
+model for one horizon) are stacked and run together, Keras models one forward
+call per model. Recursive forecasts with different horizons run to the longest
+one and are truncated. Keras batches are padded to a power of two so the
+XLA-compiled forward function sees only a handful of shapes.
+
+Everything crossing the socket is in scaled units; scalers stay with the caller.
+
+Connections are authenticated with INFERENCE_AUTHKEY. When it is not set the
+server generates a random key and writes it, readable only by its user, to
+<socket>.key, where clients on the same host pick it up.
+"""
+import os
+import sys
+import secrets
+import time
+import zlib
+import queue
+import logging
+import argparse
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+logger = logging.getLogger('stockwave')
+
+DEFAULT_SOCKET = os.environ.get('INFERENCE_SOCKET', '/tmp/stockwave-inference.sock')
+TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 30))
+
+BATCH_WINDOW_MS = 5
+MAX_BATCH = 64
+
+PREDICT = 'predict'
+FORECAST = 'forecast'
+
+
+def key_path(address: str) -> str:
+    return f"{address}.key"
+
+
+def server_authkey(address: str) -> bytes:
+    """INFERENCE_AUTHKEY, or a fresh random key written to <socket>.key with mode 0600."""
+    key = os.environ.get('INFERENCE_AUTHKEY')
+    if key:
+        return key.encode()
+    key = secrets.token_hex(32)
+    path = key_path(address)
+    if os.path.exists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(key)
+    return key.encode()
+
+
+def client_authkey(address: str) -> bytes:
+    """INFERENCE_AUTHKEY, or the key the server wrote next to its socket."""
+    key = os.environ.get('INFERENCE_AUTHKEY')
+    if key:
+        return key.encode()
+    with open(key_path(address)) as f:
+        return f.read().strip().encode()
+
+
+# === Worker processes ===
+
+def _padded(windows: np.ndarray) -> np.ndarray:
+    rows = len(windows)
+    size = 1 << max(0, rows - 1).bit_length()
+    if size == rows:
+        return windows
+    pad = np.zeros((size - rows,) + windows.shape[1:], dtype=windows.dtype)
+    return np.concatenate([windows, pad])
+
+
+def _collect(requests, batch_window: float, max_batch: int) -> list:
+    """Blocks for one request, then keeps taking requests until the window closes or the batch is full."""
+    batch = [requests.get()]
+    deadline = time.monotonic() + batch_window
+    while len(batch) < max_batch and batch[-1] is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(requests.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _split(outputs: np.ndarray, op: str, requests: list) -> list:
+    results, start = [], 0
+    for request in requests:
+        end = start + len(request['windows'])
+        rows = outputs[start:end]
+        results.append(rows if op == PREDICT else rows[:, :request['days']])
+        start = end
+    return results
+
+
+def _run_model(model, op: str, requests: list) -> list:
+    """One forward (or one recursive forecast) for every request on the same model and op."""
+    from forecast import _forward, forecast_scaled
+    from lstm_numpy import NumpyLSTM
+
+    windows = np.concatenate([request['windows'] for request in requests])
+    if op == PREDICT:
+        forward = model if isinstance(model, NumpyLSTM) else _forward(model)
+        outputs = np.asarray(forward(_padded(windows).reshape(-1, windows.shape[1], 1)))
+    else:
+        days = max(request['days'] for request in requests)
+        outputs = forecast_scaled(model, _padded(windows), days)
+    return _split(outputs, op, requests)
+
+
+def _run_group(op: str, members: list) -> list:
+    """
+    Results for (model, request) pairs whose models share an architecture, in order.
+    Several NumPy models are stacked into one StackedLSTM call, with every model's
+    windows padded to the largest request count.
+    """
+    from lstm_numpy import StackedLSTM
+
+    by_model = {}
+    for model, request in members:
+        by_model.setdefault(id(model), (model, []))[1].append(request)
+    if len(by_model) == 1:
+        model, requests = next(iter(by_model.values()))
+        return _run_model(model, op, requests)
+
+    models = [model for model, _ in by_model.values()]
+    windows = [np.concatenate([r['windows'] for r in requests]) for _, requests in by_model.values()]
+    rows = max(len(w) for w in windows)
+    stacked = np.zeros((len(windows), rows, windows[0].shape[1]), dtype=np.float32)
+    for i, w in enumerate(windows):
+        stacked[i, :len(w)] = w
+    if op == PREDICT:
+        outputs = StackedLSTM(models)(stacked)
+    else:
+        outputs = StackedLSTM(models).forecast_scaled(stacked, max(r['days'] for _, r in members))
+
+    results = {}
+    for i, (_, requests) in enumerate(by_model.values()):
+        for request, result in zip(requests, _split(outputs[i], op, requests)):
+            results[id(request)] = result
+    return [results[id(request)] for _, request in members]
+
+
+def _worker_main(requests, responses, threads: int, batch_window: float, max_batch: int):
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    from model_cache import ModelCache
+    from lstm_numpy import NumpyLSTM, load_exported
+
+    def load(model_path, _):
+        # Prefer the TensorFlow-free export; fall back to Keras for models without one.
+        lstm = load_exported(model_path)
+        if lstm is not None:
+            return lstm
+        from keras.models import load_model
+        return load_model(model_path)
+
+    models = ModelCache(load, max_size=int(os.environ.get('MODEL_CACHE_SIZE', 8)))
+
+    while True:
+        batch = _collect(requests, batch_window, max_batch)
+        stop = batch[-1] is None
+        groups = {}
+        for request in batch[:-1] if stop else batch:
+            try:
+                model = models.get(request['model_path'], request['scaler_path'])
+            except Exception as e:
+                responses.put((request['conn'], request['seq'], 'error', f"{type(e).__name__}: {e}"))
+                continue
+            # NumPy exports of the same shape run together; Keras models one at a time
+            key = model.architecture if isinstance(model, NumpyLSTM) else request['model_path']
+            groups.setdefault((key, request['op']), []).append((model, request))
+
+        for (_, op), members in groups.items():
+            try:
+                results = _run_group(op, members)
+                for (_, request), result in zip(members, results):
+                    responses.put((request['conn'], request['seq'], 'ok', result))
+            except Exception as e:
+                for _, request in members:
+                    responses.put((request['conn'], request['seq'], 'error', f"{type(e).__name__}: {e}"))
+        if stop:
+            return
+
+
+# === Server ===
+
+class InferenceServer:
+    """
+    Accepts connections on a Unix socket, routes each request to the worker that
+    owns its model, and sends results back on the connection they came from.
+    """
+
+    def __init__(self, address: str = DEFAULT_SOCKET, workers: int = 1, threads: int = 1,
+                 batch_window_ms: float = BATCH_WINDOW_MS, max_batch: int = MAX_BATCH):
+        self.address = address
+        ctx = multiprocessing.get_context('spawn')
+        self._requests = [ctx.Queue() for _ in range(max(1, workers))]
+        self._responses = ctx.Queue()
+        self._workers = [
+            ctx.Process(target=_worker_main, name=f'inference-{i}', daemon=True,
+                        args=(q, self._responses, threads, batch_window_ms / 1000, max_batch))
+            for i, q in enumerate(self._requests)
+        ]
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._next_conn = 0
+
+    def _shard(self, model_path: str):
+        return self._requests[zlib.crc32(model_path.encode()) % len(self._requests)]
+
+    def _route_responses(self):
+        while True:
+            conn_id, seq, status, payload = self._responses.get()
+            with self._lock:
+                entry = self._connections.get(conn_id)
+            if entry is not None:
+                self._send(entry, (seq, status, payload))
+
+    @staticmethod
+    def _send(entry, message):
+        # Replies come from both the router and the connection's own thread; one frame at a time.
+        conn, send_lock = entry
+        try:
+            with send_lock:
+                conn.send(message)
+        except OSError:
+            pass
+
+    def _serve_connection(self, conn_id: int, conn):
+        with self._lock:
+            entry = self._connections[conn_id]
+        try:
+            while True:
+                seq, op, model_path, scaler_path, windows, days = conn.recv()
+                if op not in (PREDICT, FORECAST):
+                    self._send(entry, (seq, 'error', f"Unknown op: {op}"))
+                    continue
+                self._shard(model_path).put({
+                    'conn': conn_id, 'seq': seq, 'op': op, 'model_path': os.path.abspath(model_path),
+                    'scaler_path': os.path.abspath(scaler_path), 'windows': windows, 'days': days,
+                })
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.pop(conn_id, None)
+            conn.close()
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        for worker in self._workers:
+            worker.start()
+        threading.Thread(target=self._route_responses, name='inference-responses', daemon=True).start()
+
+        listener = Listener(self.address, family='AF_UNIX', authkey=server_authkey(self.address))
+        logger.info(f"Inference server listening on {self.address} with {len(self._workers)} workers")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError) as e:
+                    logger.warning(f"Rejected inference connection: {e}")
+                    continue
+                with self._lock:
+                    conn_id = self._next_conn
+                    self._next_conn += 1
+                    self._connections[conn_id] = (conn, threading.Lock())
+                threading.Thread(target=self._serve_connection, args=(conn_id, conn), daemon=True).start()
+        finally:
+            listener.close()
+            for q in self._requests:
+                q.put(None)
+
+
+# === Client (web workers) ===
+
+class InferenceClient:
+    """Thread-safe client; each thread keeps its own connection with one request in flight."""
+
+    def __init__(self, address: str = DEFAULT_SOCKET, timeout: float = TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, family='AF_UNIX', authkey=client_authkey(self.address))
+            self._local.seq = 0
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def call(self, op: str, model_path: str, scaler_path: str, windows, days: int = None) -> np.ndarray:
+        windows = np.asarray(windows, dtype=np.float32).reshape(len(windows), -1)
+        try:
+            conn = self._connection()
+            self._local.seq += 1
+            seq = self._local.seq
+            conn.send((seq, op, model_path, scaler_path, windows, days))
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"No inference response within {self.timeout}s")
+            reply_seq, status, payload = conn.recv()
+        except (OSError, EOFError, TimeoutError):
+            # A late reply would be read by the next call; start over on a fresh connection.
+            self._drop()
+            raise
+        if reply_seq != seq:
+            self._drop()
+            raise ConnectionError("Inference response out of order")
+        if status != 'ok':
+            raise RuntimeError(payload)
+        return payload
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(address: str) -> InferenceClient:
+    with _clients_lock:
+        if address not in _clients:
+            _clients[address] = InferenceClient(address)
+        return _clients[address]
+
+
+class RemoteModel:
+    """
+    Stands in for a Keras model in the web worker: predict() and the recursive
+    forecast run in the inference server. If the server cannot be reached the
+    model is loaded in-process instead, so predictions keep working.
+    """
+
+    def __init__(self, model_path: str, scaler_path: str, address: str = DEFAULT_SOCKET):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self._client = get_client(address)
+        self._local = None
+
+    def _fallback(self, error):
+        if self._local is None:
+            logger.warning(f"Inference server unavailable ({error}), loading {self.model_path} in-process")
+            from keras.models import load_model
+            self._local = load_model(self.model_path)
+        return self._local
+
+    def predict(self, windows, verbose=0):
+        windows = np.asarray(windows)
+        try:
+            return self._client.call(PREDICT, self.model_path, self.scaler_path, windows.reshape(len(windows), -1))
+        except (OSError, EOFError, TimeoutError) as e:
+            return self._fallback(e).predict(windows, verbose=verbose)
+
+    def forecast_scaled(self, windows: np.ndarray, prediction_days: int) -> np.ndarray:
+        try:
+            return self._client.call(FORECAST, self.model_path, self.scaler_path, windows, prediction_days)
+        except (OSError, EOFError, TimeoutError) as e:
+            from forecast import forecast_scaled
+            return forecast_scaled(self._fallback(e), windows, prediction_days)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve LSTM forward passes to the web workers.')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path to listen on')
+    parser.add_argument('--workers', type=int, default=1, help='Inference processes; models are sharded across them')
+    parser.add_argument('--threads', type=int, default=1, help='TensorFlow threads per process')
+    parser.add_argument('--batch-ms', type=float, default=BATCH_WINDOW_MS, help='Micro-batching window')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='Requests merged per batch at most')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    InferenceServer(args.socket, args.workers, args.threads, args.batch_ms, args.max_batch).serve_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
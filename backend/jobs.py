@@ -0,0 +1,104 @@
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('stockwave')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue:
+    """
+    Runs long jobs (model training) on a small background thread pool.
+
+    Jobs are identified by a random id for polling and by a caller-chosen key for
+    deduplication: submitting a key that is already queued or running returns the
+    existing job instead of starting a second one. Finished jobs are kept for
+    `retention` seconds so clients can collect the result.
+    """
+
+    def __init__(self, max_workers: int = 1, retention: int = 3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='train')
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.retention = retention
+
+    def submit(self, key, fn, *args, **kwargs) -> dict:
+        """
+        Schedules fn(*args, report=<progress fn>, **kwargs) unless a job with the same
+        key is in flight. Returns a snapshot of the (new or existing) job.
+        """
+        with self._lock:
+            self._prune()
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                return self._snapshot(self._jobs[job_id])
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._jobs[job_id] = {
+                'id': job_id,
+                'key': key,
+                'status': QUEUED,
+                'progress': {},
+                'result': None,
+                'error': None,
+                'created_at': now,
+                'updated_at': now,
+            }
+            self._in_flight[key] = job_id
+            job = self._snapshot(self._jobs[job_id])
+
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status=RUNNING)
+        try:
+            result = fn(*args, report=lambda **progress: self.report(job_id, **progress), **kwargs)
+            self._update(job_id, status=DONE, result=result)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            self._update(job_id, status=FAILED, error=str(e))
+        finally:
+            with self._lock:
+                key = self._jobs[job_id]['key']
+                if self._in_flight.get(key) == job_id:
+                    del self._in_flight[key]
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job['updated_at'] = time.time()
+
+    def report(self, job_id, **progress):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['progress'] = dict(job['progress'], **progress)
+                job['updated_at'] = time.time()
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['status'] in (DONE, FAILED) and job['updated_at'] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _snapshot(job: dict) -> dict:
+        return dict(job, progress=dict(job['progress']))
@@ -0,0 +1,382 @@
+"""
+TensorFlow-free inference for the stacked LSTM + Dense models built by
+model.build_lstm_model().
+
+Each trained `*_lstm_model.h5` gets a sibling `*_lstm_model.npz` holding the
+layer weights and activations. NumpyLSTM runs the forward pass with vectorized
+NumPy, advancing all LSTM layers (and, for recursive forecasts, all forecast
+steps) together so the Python-level loop stays short.
+
+Export the models that are already on disk, from the backend directory:
+
+    python lstm_numpy.py                 # every models/*.h5 without a fresh .npz
+    python lstm_numpy.py --force models/AAPL_30d_lstm_model.h5
+
+Every export runs the Keras model and the NumPy one on the same random windows,
+both for a single forward pass and for a PARITY_DAYS-step recursive forecast,
+and refuses to write the artifact if their outputs differ by more than
+PARITY_TOLERANCE.
+"""
+import os
+import sys
+import glob
+import argparse
+
+import numpy as np
+
+PARITY_TOLERANCE = 1e-4
+PARITY_SAMPLES = 64
+# Recursive forecast steps compared at export; errors compound over the recursion
+PARITY_DAYS = 30
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _hard_sigmoid(x):
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)
+
+
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'linear': lambda x: x,
+}
+
+
+def artifact_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+class NumpyLSTM:
+    """
+    Forward pass of a Sequential stack of LSTM layers followed by Dense layers.
+    Behaves like the Keras model where the serving code uses it: predict() and
+    the recursive forecast in forecast.forecast_scaled().
+
+    All LSTM layers advance together as a wavefront: in iteration t layer l
+    processes timestep t - l, reading layer l - 1's output from iteration t - 1.
+    The weights of every layer are fused into one block matrix, so each
+    iteration is a single (batch, units) x (units, 4 * units) product plus the
+    gate arithmetic, however many layers are stacked.
+    """
+
+    # Leading axes of an input batch before the timestep axis
+    batch_dims = 1
+
+    def __init__(self, lstm_layers: list, dense_layers: list):
+        self.lstm_layers = lstm_layers
+        self.dense_layers = dense_layers
+        self._fuse()
+
+    def _fuse(self):
+        layers = self.lstm_layers
+        if len({(l['activation'], l['recurrent_activation']) for l in layers}) != 1:
+            raise ValueError("All LSTM layers must share their activations")
+        widths = [l['recurrent'].shape[0] for l in layers]
+        offsets = np.concatenate([[0], np.cumsum(widths)]).astype(int)
+        total = int(offsets[-1])
+
+        # Fused gate order is i, f, o, g so the three sigmoid gates are contiguous;
+        # Keras stores i, f, g, o.
+        def columns(index, gate):
+            return slice(gate * total + offsets[index], gate * total + offsets[index + 1])
+
+        kernel = np.zeros((layers[0]['kernel'].shape[0], 4 * total), dtype=np.float32)
+        matrix = np.zeros((total, 4 * total), dtype=np.float32)
+        bias = np.zeros(4 * total, dtype=np.float32)
+        for index, layer in enumerate(layers):
+            units = widths[index]
+            rows = slice(offsets[index], offsets[index + 1])
+            for gate, keras_gate in enumerate((0, 1, 3, 2)):
+                part = slice(keras_gate * units, (keras_gate + 1) * units)
+                cols = columns(index, gate)
+                matrix[rows, cols] = layer['recurrent'][:, part]
+                bias[cols] = layer['bias'][part]
+                if index == 0:
+                    kernel[:, cols] = layer['kernel'][:, part]
+                else:
+                    matrix[offsets[index - 1]:offsets[index], cols] = layer['kernel'][:, part]
+
+        # Inputs and a constant 1 ride along with the hidden state, so the input
+        # projection and bias come out of the same product: [h, x, 1] @ weights.
+        self._weights = np.concatenate([matrix, kernel, bias[None, :]])
+        self._units = total
+        self._features = kernel.shape[0]
+        self._layer_of_unit = np.repeat(np.arange(len(layers)), widths)
+        self._output = slice(offsets[-2], offsets[-1])
+        self._activation = ACTIVATIONS[layers[0]['activation']]
+        self._recurrent_activation = ACTIVATIONS[layers[0]['recurrent_activation']]
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyLSTM':
+        with np.load(path) as data:
+            lstm_layers, dense_layers = [], []
+            for i in range(int(data['lstm_count'])):
+                lstm_layers.append({
+                    'kernel': data[f'lstm{i}_kernel'],
+                    'recurrent': data[f'lstm{i}_recurrent'],
+                    'bias': data[f'lstm{i}_bias'],
+                    'activation': str(data[f'lstm{i}_activation']),
+                    'recurrent_activation': str(data[f'lstm{i}_recurrent_activation']),
+                })
+            for i in range(int(data['dense_count'])):
+                dense_layers.append({
+                    'kernel': data[f'dense{i}_kernel'],
+                    'bias': data[f'dense{i}_bias'],
+                    'activation': str(data[f'dense{i}_activation']),
+                })
+        return cls(lstm_layers, dense_layers)
+
+    def save(self, path: str):
+        arrays = {'lstm_count': len(self.lstm_layers), 'dense_count': len(self.dense_layers)}
+        for i, layer in enumerate(self.lstm_layers):
+            for name in ('kernel', 'recurrent', 'bias', 'activation', 'recurrent_activation'):
+                arrays[f'lstm{i}_{name}'] = layer[name]
+        for i, layer in enumerate(self.dense_layers):
+            for name in ('kernel', 'bias', 'activation'):
+                arrays[f'dense{i}_{name}'] = layer[name]
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def _state(self, *shape):
+        """Zeroed [h, x, 1] operand and cell state for `shape` rows."""
+        state = np.zeros(shape + (self._units + self._features + 1,), dtype=np.float32)
+        state[..., -1] = 1.0
+        return state, np.zeros(shape + (self._units,), dtype=np.float32)
+
+    def _step(self, state, c):
+        """One wavefront iteration; reads the inputs already written into `state` and updates it in place."""
+        units = self._units
+        z = state @ self._weights
+        gates = self._recurrent_activation(z[..., :3 * units])
+        c = gates[..., units:2 * units] * c + gates[..., :units] * self._activation(z[..., 3 * units:])
+        state[..., :units] = gates[..., 2 * units:] * self._activation(c)
+        return c
+
+    def _dense(self, x):
+        for layer in self.dense_layers:
+            x = ACTIVATIONS[layer['activation']](x @ layer['kernel'] + layer['bias'])
+        return x
+
+    @property
+    def architecture(self) -> tuple:
+        """Layer shapes and activations; models with equal architectures can be stacked."""
+        return (
+            tuple((l['kernel'].shape, l['recurrent'].shape, l['activation'], l['recurrent_activation'])
+                  for l in self.lstm_layers),
+            tuple((l['kernel'].shape, l['activation']) for l in self.dense_layers),
+        )
+
+    def __call__(self, x) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == self.batch_dims + 1:
+            x = x[..., None]
+        steps = x.shape[-2]
+        depth = len(self.lstm_layers)
+        units = self._units
+        state, c = self._state(*x.shape[:-2])
+        for t in range(steps + depth - 1):
+            state[..., units:-1] = x[..., t, :] if t < steps else 0.0
+            c = self._step(state, c)
+            if t < depth - 1:
+                # Layers deeper than t have not reached timestep 0 yet.
+                waiting = np.flatnonzero(self._layer_of_unit > t)
+                state[..., waiting] = 0.0
+                c[..., waiting] = 0.0
+        return self._dense(state[..., self._output])
+
+    def predict(self, x, verbose=0) -> np.ndarray:
+        return self(x)
+
+    def forecast_scaled(self, windows: np.ndarray, prediction_days: int) -> np.ndarray:
+        """
+        Recursive forecast with all `prediction_days` steps in flight at once.
+
+        Forecast step k reads the window buf[k:k + window]; only its last
+        k inputs are earlier forecasts, so it can start long before step k - 1
+        has finished. Starting step k `depth` iterations after step k - 1 is
+        enough for each forecast to be written before anything reads it, which
+        turns prediction_days sequential passes over the window into a single
+        staggered pass about window + depth * prediction_days iterations long.
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        windows = windows.reshape(windows.shape[:self.batch_dims] + (-1,))
+        batch, window = windows.shape[:-1], windows.shape[-1]
+        depth = len(self.lstm_layers)
+        stagger = max(depth, 1)
+
+        # Padded so steps still running past their last input never index out of range.
+        buf = np.zeros(batch + (window + prediction_days + depth,), dtype=np.float32)
+        buf[..., :window] = windows
+        reads = (stagger - 1) * np.arange(prediction_days)
+        waiting = [np.flatnonzero(self._layer_of_unit > lag) for lag in range(depth)]
+        units = self._units
+        state, c = self._state(*batch, prediction_days)
+
+        # Step k starts in iteration stagger * k, reads buf[t - (stagger - 1) * k]
+        # in iteration t, and its last layer reaches timestep window - 1 in
+        # iteration stagger * k + window + depth - 2.
+        span = window + depth - 2
+        for t in range(stagger * (prediction_days - 1) + span + 1):
+            lo = max(0, -(-(t - span) // stagger))
+            hi = min(prediction_days, t // stagger + 1)
+            rows = state[..., lo:hi, :]
+            rows[..., units] = buf[..., t - reads[lo:hi]]
+            c[..., lo:hi, :] = self._step(rows, c[..., lo:hi, :])
+
+            # Deeper layers of the newest steps have not reached timestep 0 yet.
+            for k in range(hi - 1, lo - 1, -1):
+                lag = t - stagger * k
+                if lag >= depth - 1:
+                    break
+                rows[..., k - lo, waiting[lag]] = 0.0
+                c[..., k, waiting[lag]] = 0.0
+
+            if t - span >= 0 and (t - span) % stagger == 0:
+                k = (t - span) // stagger
+                buf[..., window + k] = self._dense(state[..., k:k + 1, self._output])[..., 0, 0]
+        return buf[..., window:window + prediction_days]
+
+
+class StackedLSTM(NumpyLSTM):
+    """
+    Several NumpyLSTMs with the same architecture (e.g. every ticker's model for one
+    horizon) evaluated together. Inputs carry a leading model axis, (models, batch,
+    window[, 1]), and each wavefront iteration is one batched product against the
+    stacked weights instead of one product per model.
+    """
+
+    batch_dims = 2
+
+    def __init__(self, models: list):
+        first = models[0]
+        if any(model.architecture != first.architecture for model in models):
+            raise ValueError("Only models with the same architecture can be stacked")
+        self.lstm_layers = first.lstm_layers
+        for name in ('_units', '_features', '_layer_of_unit', '_output', '_activation', '_recurrent_activation'):
+            setattr(self, name, getattr(first, name))
+        # The singleton axis broadcasts each model's weights over its rows; __call__
+        # adds a matching axis so its matrix products have the same layout.
+        self._weights = np.stack([model._weights for model in models])[:, None]
+        self.dense_layers = [
+            {
+                'kernel': np.stack([model.dense_layers[i]['kernel'] for model in models])[:, None],
+                'bias': np.stack([model.dense_layers[i]['bias'] for model in models])[:, None, None],
+                'activation': layer['activation'],
+            }
+            for i, layer in enumerate(first.dense_layers)
+        ]
+
+    def __call__(self, x) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == self.batch_dims + 1:
+            x = x[..., None]
+        return super().__call__(x[:, :, None])[:, :, 0]
+
+
+def from_keras(model) -> NumpyLSTM:
+    """Copies the weights of a Sequential LSTM... -> Dense... Keras model."""
+    lstm_layers, dense_layers = [], []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        if kind == 'LSTM' and not dense_layers:
+            if not config.get('use_bias', True):
+                raise ValueError(f"LSTM layer {layer.name} without bias is not supported")
+            kernel, recurrent, bias = layer.get_weights()
+            lstm_layers.append({
+                'kernel': kernel.astype(np.float32),
+                'recurrent': recurrent.astype(np.float32),
+                'bias': bias.astype(np.float32),
+                'activation': config['activation'],
+                'recurrent_activation': config['recurrent_activation'],
+            })
+        elif kind == 'Dense' and lstm_layers:
+            kernel, bias = layer.get_weights()
+            dense_layers.append({
+                'kernel': kernel.astype(np.float32),
+                'bias': bias.astype(np.float32),
+                'activation': config['activation'],
+            })
+        else:
+            raise ValueError(f"Unsupported layer for NumPy export: {kind} ({layer.name})")
+    for layer in lstm_layers + dense_layers:
+        for key in ('activation', 'recurrent_activation'):
+            if key in layer and layer[key] not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation for NumPy export: {layer[key]}")
+    return NumpyLSTM(lstm_layers, dense_layers)
+
+
+def parity_error(model, lstm: NumpyLSTM, samples: int = PARITY_SAMPLES, seed: int = 0,
+                 days: int = PARITY_DAYS) -> float:
+    """
+    Largest absolute difference between Keras and NumPy on random scaled windows,
+    over both the direct outputs and a `days`-step recursive forecast.
+    """
+    from forecast import forecast_scaled
+
+    window = model.input_shape[1]
+    x = np.random.default_rng(seed).random((samples, window, 1), dtype=np.float32)
+    expected = np.asarray(model(x, training=False))
+    direct = float(np.max(np.abs(expected - lstm(x))))
+    recursive = np.abs(forecast_scaled(model, x, days) - lstm.forecast_scaled(x, days))
+    return max(direct, float(np.max(recursive)))
+
+
+def export(model, model_path: str, tolerance: float = PARITY_TOLERANCE) -> float:
+    """
+    Writes the NumPy artifact for a Keras model saved at `model_path` after checking
+    parity; raises ValueError (and writes nothing) if the outputs disagree.
+    Returns the measured parity error.
+    """
+    lstm = from_keras(model)
+    error = parity_error(model, lstm)
+    if not error <= tolerance:
+        raise ValueError(f"NumPy export of {model_path} differs from Keras by {error:.2e} (tolerance {tolerance:.0e})")
+    lstm.save(artifact_path(model_path))
+    return error
+
+
+def load_exported(model_path: str):
+    """The NumpyLSTM exported for `model_path`, or None if there is none or the .h5 is newer."""
+    path = artifact_path(model_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(model_path):
+            return None
+    except OSError:
+        return None
+    return NumpyLSTM.load(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export trained Keras LSTMs for TensorFlow-free inference.')
+    parser.add_argument('models', nargs='*', help='Model files to export (default: models/*_lstm_model.h5)')
+    parser.add_argument('--force', action='store_true', help='Re-export models whose artifact is up to date')
+    parser.add_argument('--tolerance', type=float, default=PARITY_TOLERANCE, help='Maximum allowed Keras/NumPy difference')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    from keras.models import load_model
+
+    paths = args.models or sorted(glob.glob(os.path.join('models', '*_lstm_model.h5')))
+    failed = 0
+    for path in paths:
+        if not args.force and load_exported(path) is not None:
+            print(f"{path}: up to date")
+            continue
+        try:
+            error = export(load_model(path, compile=False), path, args.tolerance)
+            print(f"{path}: exported, max abs diff {error:.2e}")
+        except Exception as e:
+            failed += 1
+            print(f"{path}: FAILED: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
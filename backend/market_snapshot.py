@@ -0,0 +1,106 @@
+import os
+import time
+import logging
+import threading
+
+from metrics import yfinance_call
+
+logger = logging.getLogger('stockwave')
+
+# How often the background thread re-downloads the quote table.
+REFRESH_SECONDS = int(os.environ.get('SNAPSHOT_REFRESH_SECONDS', 60))
+
+
+def _download_quotes(symbols: list[str]) -> dict:
+    """
+    Downloads today's daily bar for every symbol in one request and reduces it to
+    {symbol: (open, last, change_pct)}. A single 1d bar carries the session open
+    and the latest price, so there is no need for ~390 one-minute bars per ticker.
+    """
+    import yfinance as yf
+
+    frame = yfinance_call(
+        'download',
+        yf.download,
+        tickers=" ".join(symbols),
+        period='1d',
+        interval='1d',
+        group_by='ticker',
+        threads=True,
+        progress=False,
+    )
+    quotes = {}
+    for symbol in symbols:
+        try:
+            df = frame[symbol].dropna(subset=['Open', 'Close'])
+        except KeyError:
+            continue
+        if df.empty:
+            continue
+        opening = round(float(df['Open'].iloc[0]), 2)
+        current = round(float(df['Close'].iloc[-1]), 2)
+        change = round(((current - opening) / opening) * 100, 2) if opening else 0.0
+        quotes[symbol] = (opening, current, change)
+    return quotes
+
+
+class MarketSnapshot:
+    """
+    Keeps the latest (open, last, change) record for a fixed set of symbols in
+    memory and refreshes it from Yahoo on a background thread, so API reads never
+    wait on a download after the first one.
+    """
+
+    def __init__(self, symbols, refresh_seconds: int = REFRESH_SECONDS, download=_download_quotes):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.refresh_seconds = refresh_seconds
+        self._download = download
+        self._quotes = {}
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def refresh(self):
+        try:
+            quotes = self._download(self.symbols)
+        except Exception as e:
+            logger.warning(f"Market snapshot refresh failed, keeping previous quotes: {e}")
+            return
+        missing = set(self.symbols) - set(quotes)
+        if missing:
+            logger.info(f"No recent data for {', '.join(sorted(missing))}")
+        # Keep the last known quote for symbols missing from this download.
+        self._quotes = {**self._quotes, **quotes}
+        self.updated_at = time.time()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            self.refresh()
+
+    def start(self):
+        """Loads the first snapshot synchronously and starts the refresh thread once."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.refresh()
+            self._thread = threading.Thread(target=self._run, name='market-snapshot', daemon=True)
+            self._thread.start()
+
+    def quotes(self, symbols: list[str]) -> list[dict]:
+        """Returns [{'symbol', 'price', 'change'}] for the requested symbols that have a quote."""
+        if self._thread is None:
+            self.start()
+        quotes = self._quotes
+        data = []
+        for symbol in symbols:
+            record = quotes.get(symbol)
+            if record is None:
+                continue
+            _, current, change = record
+            data.append({
+                'symbol': symbol,
+                'price': current,
+                'change': f"{'+' if change >= 0 else ''}{change}%",
+            })
+        return data
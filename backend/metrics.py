@@ -0,0 +1,200 @@
+"""
+In-process metrics exported in the Prometheus text format at /metrics.
+
+Hot paths wrap themselves in `timed(stage)`, which observes a latency
+histogram and, while a request is being served, adds the time to that
+request's Server-Timing entries. Caches count hits and misses with `count()`,
+and yfinance calls go through `yfinance_call()`. Everything is plain Python with a lock per metric,
+so the API does not need prometheus_client.
+"""
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import ContextDecorator
+
+# Upper bounds in seconds, from cache reads to full trainings.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount: float = 1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *values):
+        with self._lock:
+            counts, total = self._values.get(values, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self._values[values] = (counts, total + seconds)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    out.append((f'{self.name}_bucket', _labels(self.labels + ('le',), key + (le,)), cumulative))
+                out.append((f'{self.name}_sum', _labels(self.labels, key), total))
+                out.append((f'{self.name}_count', _labels(self.labels, key), cumulative))
+        return out
+
+
+class Registry:
+    """Named metrics plus callbacks that report values owned elsewhere (e.g. cache hit counts)."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels)
+            return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels=()) -> Histogram:
+        return self._get(Histogram, name, help, labels)
+
+    def collector(self, fn):
+        """fn() returns [(name, type, help, [(labels dict, value)])], read on every scrape."""
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            kind = 'counter' if isinstance(metric, Counter) else 'histogram'
+            lines += [f'# HELP {metric.name} {metric.help}', f'# TYPE {metric.name} {kind}']
+            lines += [f'{name}{labels} {value}' for name, labels, value in metric.samples()]
+        for collect in collectors:
+            for name, kind, help, values in collect():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{_labels(tuple(labels), tuple(labels.values()))} {value}' for labels, value in values]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    'stockwave_stage_seconds', 'Time spent in each pipeline stage.', ('stage',))
+cache_requests = registry.counter(
+    'stockwave_cache_requests_total', 'Cache lookups by cache and result (hit, miss, stale).', ('cache', 'result'))
+yfinance_requests = registry.counter(
+    'stockwave_yfinance_requests_total', 'Calls to Yahoo Finance by call and outcome.', ('call', 'outcome'))
+yfinance_seconds = registry.histogram(
+    'stockwave_yfinance_seconds', 'Latency of calls to Yahoo Finance.', ('call',))
+request_seconds = registry.histogram(
+    'stockwave_request_seconds', 'HTTP request latency by endpoint and status.', ('endpoint', 'status'))
+
+
+# === Per-request timings (Server-Timing) ===
+
+_request_timings = contextvars.ContextVar('stockwave_request_timings', default=None)
+
+
+def start_request():
+    """Starts collecting stage timings for the current request; returns a token for end_request()."""
+    return _request_timings.set([])
+
+
+def end_request(token) -> list:
+    """Stops collecting and returns [(stage, seconds)] in the order they finished."""
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing(timings: list, total: float = None) -> str:
+    """Server-Timing header value; repeated stages are summed."""
+    durations = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in durations.items())
+
+
+class timed(ContextDecorator):
+    """Context manager and decorator timing one pipeline stage."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call, so concurrent calls keep their own start time.
+        return timed(self.stage)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._start
+        stage_seconds.observe(seconds, self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, seconds))
+        return False
+
+
+def count(cache: str, result: str):
+    cache_requests.inc(cache, result)
+
+
+def yfinance_call(call: str, fn, *args, **kwargs):
+    """Runs one yfinance call, counting it and recording its latency under `call`."""
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception:
+        yfinance_requests.inc(call, 'error')
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        yfinance_seconds.observe(seconds, call)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((f'yfinance_{call}', seconds))
+    yfinance_requests.inc(call, 'ok')
+    return result
@@ -1,23 +1,56 @@
 import os
 import json
+import math
 import logging
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from keras.models import Sequential, load_model
-from keras.layers import LSTM, Dense
-from keras.callbacks import EarlyStopping
-from sklearn.preprocessing import MinMaxScaler
-import joblib
+from registry import ModelRegistry, data_version
+from price_cache import fetch_stock_data, fetch_close_prices
+from model_cache import ModelCache
+from backtest import BACKTEST_DAYS, HOLDOUT_DAYS, BacktestCache, backtest_metrics
+from forecast import recursive_forecast
+from metrics import count, timed, registry as metrics_registry
+from windows import WINDOW_SIZE, DATASET_THRESHOLD, sliding_windows, input_windows, windows_dataset, sample_count
+
+# Keras, scikit-learn and joblib are imported inside the functions that train or
+# load models, so processes that only serve search, quotes or stored charts never
+# pay for TensorFlow at startup.
 
 # === Constants ===
-DATA_DIR = 'stock_data'
 MODEL_DIR = 'models'
 LOG_FILE = 'stock_predictor.log'
 
-os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+MODEL_CACHE_SIZE = int(os.environ.get('MODEL_CACHE_SIZE', 8))
+# Set to the socket of a running inference.py server to run forward passes there
+INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET')
+# Serve models from their NumPy export (lstm_numpy.py) when one is up to date and
+# INFERENCE_SOCKET is not set
+NUMPY_INFERENCE = os.environ.get('NUMPY_INFERENCE', '1') != '0'
+# 'recursive' trains one single-step model per ticker and serves every horizon by
+# feeding its predictions back in; 'direct' trains a Dense(prediction_days) model
+# per horizon.
+MODEL_MODE = os.environ.get('MODEL_MODE', 'recursive')
+registry = ModelRegistry(MODEL_DIR)
+
+# Warm start: when new bars arrive, fine-tune the stored model on the windows that
+# touch them instead of training from scratch, unless the policy below says the
+# model has drifted too far and needs a full retrain.
+FINE_TUNE = os.environ.get('FINE_TUNE', '1') != '0'
+FINE_TUNE_EPOCHS = 3
+FINE_TUNE_LEARNING_RATE = 1e-4
+FINE_TUNE_MAX_NEW_BARS = 20
+# Recent windows of already-seen bars replayed with the new ones, so a handful of
+# new samples does not pull the model away from the rest of the history
+FINE_TUNE_REPLAY_WINDOWS = WINDOW_SIZE
+FINE_TUNE_MAX_ROUNDS = 20
+# New closes may leave the scaler's fitted [0, 1] range by this much
+SCALER_DRIFT_TOLERANCE = 0.05
+# Fine-tuning must lower the loss on the new windows, and that loss may be at most
+# this multiple of the last full training's loss (recent windows run a bit higher)
+LOSS_DEGRADATION = 3.0
+
 # === Logger Setup ===
 logger = logging.getLogger('StockPredictor')
 logger.setLevel(logging.INFO)
@@ -29,42 +62,37 @@ if not logger.handlers:
 def sanitize_ticker_for_filename(ticker: str) -> str:
     return ticker.replace('.', '_')
 
-def sanitize_datetime_index(df):
-    if isinstance(df.index, pd.DatetimeIndex):
-        if df.index.tz is not None:
-            df.index = df.index.tz_localize(None)
-    else:
-        df.index = pd.to_datetime(df.index, utc=True)
-    return df
-
-def fetch_stock_data(ticker: str, period: str = '2y') -> pd.DataFrame:
-    ticker = ticker.upper().strip()
-    filepath = os.path.join(DATA_DIR, f"{ticker.replace('.', '_')}_{period}.csv")
-
-    try:
-        if os.path.exists(filepath):
-            logger.info(f"Loading cached data for {ticker}")
-            df = pd.read_csv(filepath, index_col=0, parse_dates=True)
-        else:
-            logger.info(f"Fetching new data for {ticker}")
-            stock = yf.Ticker(ticker)
-            df = stock.history(period=period)
-
-            if df.empty or 'Close' not in df.columns:
-                raise ValueError(f"No data or missing 'Close' prices for {ticker}.")
-
-            df = sanitize_datetime_index(df)
-            df.to_csv(filepath)
-
-        df = sanitize_datetime_index(df)
-        logger.info(f"Fetched {len(df)} rows for {ticker}. Sample:\n{df.head()}")
-        return df
-
-    except Exception as e:
-        logger.error(f"Failed to fetch data for {ticker}: {e}")
-        raise ValueError(f"Invalid or unsupported ticker: {ticker}")
-
-def build_lstm_model(input_shape: tuple, output_size: int) -> Sequential:
+@timed('model_load')
+def _load_model_and_scaler(model_path: str, scaler_path: str):
+    import joblib
+    # An explicitly configured inference server wins over the in-process NumPy export.
+    if INFERENCE_SOCKET:
+        from inference import RemoteModel
+        return RemoteModel(model_path, scaler_path, INFERENCE_SOCKET), joblib.load(scaler_path)
+    if NUMPY_INFERENCE:
+        from lstm_numpy import load_exported
+        lstm = load_exported(model_path)
+        if lstm is not None:
+            logger.info(f"Loading NumPy export of {model_path}")
+            return lstm, joblib.load(scaler_path)
+    from keras.models import load_model
+    logger.info(f"Loading model from {model_path}")
+    return load_model(model_path), joblib.load(scaler_path)
+
+model_cache = ModelCache(_load_model_and_scaler, max_size=MODEL_CACHE_SIZE)
+backtest_cache = BacktestCache()
+
+@metrics_registry.collector
+def _model_cache_metrics():
+    return [
+        ('stockwave_model_cache_requests_total', 'counter', 'Loaded-model cache lookups by result.',
+         [({'result': 'hit'}, model_cache.hits), ({'result': 'miss'}, model_cache.misses)]),
+        ('stockwave_model_cache_entries', 'gauge', 'Models currently held in memory.', [({}, len(model_cache))]),
+    ]
+
+def build_lstm_model(input_shape: tuple, output_size: int):
+    from keras.models import Sequential
+    from keras.layers import LSTM, Dense
     model = Sequential([
         LSTM(50, return_sequences=True, input_shape=input_shape),
         LSTM(50),
@@ -73,40 +101,164 @@ def build_lstm_model(input_shape: tuple, output_size: int) -> Sequential:
     model.compile(optimizer='adam', loss='mean_squared_error')
     return model
 
-def train_lstm_model(ticker: str, prediction_days: int = 5, epochs: int = 10, return_model: bool = False):
-    df = fetch_stock_data(ticker)
+def progress_callback(report, epochs: int = None):
+    """
+    Keras callback forwarding per-epoch loss to a report(epoch=, epochs=, loss=) function,
+    e.g. a job's progress. Without `epochs` it reports the epoch count of the fit it is
+    attached to, which differs between a full training and a fine-tune.
+    """
+    from keras.callbacks import Callback
+
+    class TrainingProgress(Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            total = epochs or self.params.get('epochs')
+            loss = float((logs or {}).get('loss', float('nan')))
+            # NaN is not valid JSON; report an unknown loss as null
+            report(epoch=epoch + 1, epochs=total, loss=loss if math.isfinite(loss) else None)
+
+    return TrainingProgress()
+
+def model_hyperparams(epochs: int = 10) -> dict:
+    return {'window': WINDOW_SIZE, 'units': 50, 'layers': 2, 'epochs': epochs, 'batch_size': 32}
+
+def model_horizon(prediction_days: int) -> int:
+    """Output steps of the model that serves `prediction_days`; also its registry slot."""
+    return 1 if MODEL_MODE == 'recursive' else prediction_days
+
+def forecast_prices(model, scaler, close_prices, prediction_days: int, horizon: int) -> np.ndarray:
+    """
+    Next `prediction_days` prices from the last 60 closes: read directly off the
+    model's outputs when it predicts that far, recursively otherwise.
+    """
+    last_60_days = scaler.transform(np.asarray(close_prices, dtype='float64').reshape(-1, 1)[-WINDOW_SIZE:])
+    if horizon >= prediction_days:
+        prediction = model.predict(last_60_days.reshape((1, WINDOW_SIZE, 1)), verbose=0)[:, :prediction_days]
+        return scaler.inverse_transform(prediction)[0]
+    return np.asarray(recursive_forecast(model, last_60_days, scaler, prediction_days))
+
+def fine_tune_plan(meta, df: pd.DataFrame, hyperparams: dict):
+    """
+    Decides whether the stored model described by `meta` can be fine-tuned on `df`.
+    Returns (new_bars, None) when it can, or (0, reason) when a full retrain is needed.
+    """
+    if not meta:
+        return 0, "no stored model"
+    if meta.get('hyperparams') != hyperparams:
+        return 0, "hyperparameters changed"
+    if meta.get('data_version') == data_version(df):
+        return 0, "stored model is already trained on this data"
+    if meta.get('fine_tunes', 0) >= FINE_TUNE_MAX_ROUNDS:
+        return 0, f"{FINE_TUNE_MAX_ROUNDS} fine-tunes since the last full retrain"
+    last_bar = meta.get('last_bar')
+    if not last_bar:
+        return 0, "no last trained bar recorded"
+    position = df.index.searchsorted(pd.Timestamp(last_bar), side='right')
+    if position == 0 or df.index[position - 1].strftime('%Y-%m-%d') != last_bar:
+        return 0, f"history no longer contains the last trained bar {last_bar}"
+    new_bars = int(len(df) - position)
+    if new_bars == 0:
+        # Same bars, different data version: prices were restated (splits, dividends)
+        return 0, "history was restated"
+    if new_bars > FINE_TUNE_MAX_NEW_BARS:
+        return 0, f"{new_bars} new bars (more than {FINE_TUNE_MAX_NEW_BARS})"
+    return new_bars, None
+
+def fine_tune_lstm_model(ticker: str, horizon: int, epochs: int, df: pd.DataFrame, callbacks: list = None):
+    """
+    Continues training the stored model for (ticker, horizon) on the windows that
+    end on bars added since it was last trained, plus the FINE_TUNE_REPLAY_WINDOWS
+    windows before them, keeping its scaler.
+    Returns (model, scaler, meta_fields), or None when a full retrain is needed:
+    no usable stored model, too many new bars, prices outside the scaler's range,
+    or a fine-tuned loss much worse than the last full training's.
+    """
+    meta = registry.meta(ticker, horizon)
+    new_bars, reason = fine_tune_plan(meta, df, model_hyperparams(epochs))
+    paths = registry.paths(ticker, horizon)
+    if reason is None and not (os.path.exists(paths['model']) and os.path.exists(paths['scaler'])):
+        reason = "model files missing"
+    if reason is not None:
+        logger.info(f"Full retrain for {ticker} ({horizon}d): {reason}")
+        return None
+
+    import joblib
+    from keras.models import load_model
+    from keras.optimizers import Adam
+
+    scaler = joblib.load(paths['scaler'])
+    scaled_data = scaler.transform(df['Close'].values.reshape(-1, 1))
+    recent = scaled_data[-new_bars:]
+    if recent.min() < -SCALER_DRIFT_TOLERANCE or recent.max() > 1 + SCALER_DRIFT_TOLERANCE:
+        logger.info(f"Full retrain for {ticker} ({horizon}d): new prices outside the scaler range")
+        return None
+
+    # The last `new_bars` windows end on a new bar; the ones before them are replayed
+    samples = min(new_bars + FINE_TUNE_REPLAY_WINDOWS, sample_count(len(scaled_data), WINDOW_SIZE, horizon))
+    X, y = sliding_windows(scaled_data[-(samples + WINDOW_SIZE + horizon - 1):], WINDOW_SIZE, horizon)
+
+    model = load_model(paths['model'], compile=False)
+    model.compile(optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE), loss='mean_squared_error')
+    logger.info(f"Fine-tuning model for {ticker} on {len(X)} windows ({new_bars} new bars)")
+    before = float(model.evaluate(X, y, verbose=0))
+    model.fit(X, y, epochs=FINE_TUNE_EPOCHS, batch_size=32, verbose=0, callbacks=list(callbacks or []))
+    loss = float(model.evaluate(X, y, verbose=0))
+
+    base_loss = meta.get('base_loss', meta.get('loss'))
+    if loss > before or (base_loss and loss > base_loss * LOSS_DEGRADATION):
+        logger.info(f"Full retrain for {ticker} ({horizon}d): fine-tuned loss {loss:.5f} "
+                    f"(before {before:.5f}, last full training {base_loss})")
+        return None
+    # The holdout model is left as it is: the new bars only extend its scored range
+    return model, scaler, {'training': 'fine_tune', 'loss': loss, 'base_loss': base_loss,
+                           'fine_tunes': meta.get('fine_tunes', 0) + 1, 'new_bars': new_bars,
+                           'holdout_last_bar': meta.get('holdout_last_bar')}
+
+@timed('train')
+def train_lstm_model(ticker: str, prediction_days: int = 5, epochs: int = 10, return_model: bool = False, df: pd.DataFrame = None, callbacks: list = None, warm_start: bool = None):
+    """
+    Trains (or, with warm_start, fine-tunes) the model serving `prediction_days`,
+    stores it in the registry and returns the predicted prices.
+    warm_start defaults to FINE_TUNE; a full retrain happens whenever fine-tuning is not possible.
+    """
+    import joblib
+
+    if df is None:
+        df = fetch_stock_data(ticker)
     close_prices = df['Close'].values.reshape(-1, 1)
+    horizon = model_horizon(prediction_days)
 
-    scaler = MinMaxScaler()
-    scaled_data = scaler.fit_transform(close_prices)
-
-    X_train, y_train = [], []
-    for i in range(60, len(scaled_data) - prediction_days):
-        X_train.append(scaled_data[i - 60:i, 0])
-        y_train.append(scaled_data[i:i + prediction_days, 0])
-
-    if not X_train:
-        raise ValueError("Insufficient data to train the model.")
-
-    X_train = np.array(X_train).reshape((-1, 60, 1))
-    y_train = np.array(y_train)
-
-    model = build_lstm_model((60, 1), prediction_days)
-    logger.info(f"Training model for {ticker} - X: {X_train.shape}, y: {y_train.shape}")
-
-    early_stop = EarlyStopping(monitor='loss', patience=3)
-    model.fit(X_train, y_train, epochs=epochs, batch_size=32, verbose=1, callbacks=[early_stop])
-
-    safe_ticker = sanitize_ticker_for_filename(ticker)
-    model_path = os.path.join(MODEL_DIR, f"{safe_ticker}_lstm_model.h5")
-    scaler_path = os.path.join(MODEL_DIR, f"{safe_ticker}_scaler.pkl")
-    model.save(model_path)
-    joblib.dump(scaler, scaler_path)
-
-    last_60_days = scaled_data[-60:]
-    X_test = np.array([last_60_days]).reshape((1, 60, 1))
-    prediction = model.predict(X_test)
-    predicted_prices = scaler.inverse_transform(prediction)[0]
+    # One training per registry slot at a time; every horizon shares the slot in recursive mode.
+    with registry.lock(ticker, horizon):
+        tuned = fine_tune_lstm_model(ticker, horizon, epochs, df, callbacks) if (FINE_TUNE if warm_start is None else warm_start) else None
+        if tuned is not None:
+            model, scaler, fields = tuned
+        else:
+            model, scaler, fields = _train_from_scratch(ticker, horizon, epochs, close_prices, callbacks)
+        # A fine-tuned model keeps its holdout model, unless it was trained before there was one
+        if tuned is None or not fields.get('holdout_last_bar'):
+            fields['holdout_last_bar'] = _train_holdout(ticker, horizon, epochs, df)
+
+        paths = registry.paths(ticker, horizon)
+        model.save(paths['model'])
+        joblib.dump(scaler, paths['scaler'])
+        try:
+            from lstm_numpy import export
+            export(model, paths['model'])
+        except ValueError as e:
+            logger.warning(f"Serving {ticker} ({horizon}d) with Keras: {e}")
+        # Drop any cached pair rather than caching this Keras model, so the next load
+        # goes through _load_model_and_scaler (NumPy export or inference server).
+        model_cache.invalidate(paths['model'])
+        registry.record(
+            ticker, horizon, data_version(df), model_hyperparams(epochs),
+            mode=MODEL_MODE,
+            horizon=horizon,
+            rows=len(df),
+            last_bar=df.index[-1].strftime('%Y-%m-%d'),
+            **fields,
+        )
+
+    predicted_prices = forecast_prices(model, scaler, close_prices, prediction_days, horizon)
 
     logger.info(f"Predicted prices for {ticker}: {json.dumps(predicted_prices.tolist())}")
 
@@ -114,38 +266,196 @@ def train_lstm_model(ticker: str, prediction_days: int = 5, epochs: int = 10, re
         return close_prices.flatten(), predicted_prices, model, scaler, df
     return predicted_prices
 
-def recursive_forecast(model, last_60_days: np.ndarray, scaler: MinMaxScaler, prediction_days: int):
-    forecast = []
-    input_seq = last_60_days.copy()
+def _train_from_scratch(ticker: str, horizon: int, epochs: int, close_prices: np.ndarray, callbacks: list = None):
+    from keras.callbacks import EarlyStopping
+    from sklearn.preprocessing import MinMaxScaler
 
-    for _ in range(prediction_days):
-        input_array = np.array([input_seq]).reshape((1, 60, 1))
-        next_scaled = model.predict(input_array, verbose=0)[0][0]
-        next_price = scaler.inverse_transform([[next_scaled]])[0][0]
-        forecast.append(next_price)
+    scaler = MinMaxScaler()
+    scaled_data = scaler.fit_transform(close_prices)
 
-        input_seq = np.append(input_seq[1:], [[next_scaled]], axis=0)
+    samples = sample_count(len(scaled_data), WINDOW_SIZE, horizon)
+    if samples == 0:
+        raise ValueError("Insufficient data to train the model.")
 
-    return forecast
+    model = build_lstm_model((WINDOW_SIZE, 1), horizon)
+    early_stop = EarlyStopping(monitor='loss', patience=3)
+    callbacks = [early_stop] + list(callbacks or [])
 
-def predict_next_days(ticker: str, prediction_days: int = 30):
+    if samples > DATASET_THRESHOLD:
+        logger.info(f"Training model for {ticker} - {samples} windows via tf.data")
+        dataset = windows_dataset(scaled_data, WINDOW_SIZE, horizon, batch_size=32)
+        history = model.fit(dataset, epochs=epochs, verbose=1, callbacks=callbacks)
+    else:
+        X_train, y_train = sliding_windows(scaled_data, WINDOW_SIZE, horizon)
+        logger.info(f"Training model for {ticker} - X: {X_train.shape}, y: {y_train.shape}")
+        history = model.fit(X_train, y_train, epochs=epochs, batch_size=32, verbose=1, callbacks=callbacks)
+
+    loss = float(history.history['loss'][-1])
+    return model, scaler, {'training': 'full', 'loss': loss, 'base_loss': loss, 'fine_tunes': 0}
+
+def _train_holdout(ticker: str, horizon: int, epochs: int, df: pd.DataFrame):
+    """
+    Trains the model the backtest scores: set up like the served one, but without the
+    last HOLDOUT_DAYS bars. Returns the date of its last training bar, or None when
+    the history is too short to leave bars out.
+    """
+    import joblib
+
+    close_prices = df['Close'].values.reshape(-1, 1)[:-HOLDOUT_DAYS]
+    if sample_count(len(close_prices), WINDOW_SIZE, horizon) == 0:
+        logger.info(f"No holdout model for {ticker} ({horizon}d): {len(df)} bars")
+        return None
+    model, scaler, _ = _train_from_scratch(f"{ticker} holdout", horizon, epochs, close_prices)
+    paths = registry.paths(ticker, horizon)
+    model.save(paths['holdout_model'])
+    joblib.dump(scaler, paths['holdout_scaler'])
     try:
-        safe_ticker = sanitize_ticker_for_filename(ticker)
-        model_path = os.path.join(MODEL_DIR, f"{safe_ticker}_lstm_model.h5")
-        scaler_path = os.path.join(MODEL_DIR, f"{safe_ticker}_scaler.pkl")
+        from lstm_numpy import export
+        export(model, paths['holdout_model'])
+    except ValueError as e:
+        logger.warning(f"Backtesting {ticker} ({horizon}d) with Keras: {e}")
+    return df.index[-HOLDOUT_DAYS - 1].strftime('%Y-%m-%d')
 
-        if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+def has_fresh_model(ticker: str, prediction_days: int = 5, epochs: int = 10) -> bool:
+    df = fetch_stock_data(ticker)
+    return registry.lookup(ticker, model_horizon(prediction_days), data_version(df), model_hyperparams(epochs)) is not None
+
+def load_or_train_model(ticker: str, prediction_days: int = 5, epochs: int = 10, callbacks: list = None):
+    """
+    Serves (close_prices, predicted_prices, model, scaler, df) from the model
+    registry when the model serving this horizon was trained on the current data
+    with the current hyperparameters; trains a new one otherwise.
+    """
+    df = fetch_stock_data(ticker)
+    horizon = model_horizon(prediction_days)
+    meta = registry.lookup(ticker, horizon, data_version(df), model_hyperparams(epochs))
+    if meta is None:
+        with registry.lock(ticker, horizon):
+            # Another job may have trained this slot while we waited for the lock.
+            meta = registry.lookup(ticker, horizon, data_version(df), model_hyperparams(epochs))
+            if meta is None:
+                logger.info(f"No fresh model for {ticker} ({prediction_days}d), training")
+                return train_lstm_model(ticker, prediction_days, epochs, return_model=True, df=df, callbacks=callbacks)
+
+    logger.info(f"Serving stored model for {ticker} ({prediction_days}d, {meta['data_version']})")
+    model, scaler = model_cache.get(meta['paths']['model'], meta['paths']['scaler'])
+
+    close_prices = df['Close'].to_numpy(dtype='float64')
+    predicted_prices = forecast_prices(model, scaler, close_prices, prediction_days, meta['prediction_days'])
+    return close_prices, predicted_prices, model, scaler, df
+
+@timed('backtest')
+def backtest_predictions(model, scaler, close_prices, num_days: int = 365):
+    """
+    One-step-ahead predictions for each of the last `num_days` closes, each made from
+    the 60 closes before it, in a single batched model.predict call.
+    Returns (actual, predicted) arrays of equal length.
+    """
+    close = np.asarray(close_prices, dtype='float64').reshape(-1, 1)
+    num_days = min(num_days, len(close) - WINDOW_SIZE)
+    if num_days <= 0:
+        raise ValueError(f"Insufficient data for backtest. Required: {WINDOW_SIZE + 1}+, Found: {len(close)}")
+
+    scaled = scaler.transform(close[-(num_days + WINDOW_SIZE):])
+    X = input_windows(scaled[:-1], WINDOW_SIZE)
+    predicted = model.predict(X, verbose=0)[:, :1]
+    return close[-num_days:, 0], scaler.inverse_transform(predicted)[:, 0]
+
+def stored_model_meta(ticker: str, prediction_days: int = None):
+    """
+    Metadata (with paths) of the stored model serving this horizon if one was
+    trained, otherwise of the ticker's most recently trained model; None if neither.
+    """
+    if prediction_days is not None:
+        horizon = model_horizon(prediction_days)
+        meta = registry.meta(ticker, horizon)
+        paths = registry.paths(ticker, horizon)
+        if meta and os.path.exists(paths['model']) and os.path.exists(paths['scaler']):
+            return dict(meta, paths=paths)
+    return registry.latest(ticker)
+
+def model_version(meta) -> str:
+    if meta is None:
+        return 'untrained'
+    return f"{meta.get('data_version', 'legacy')}@{meta.get('trained_at', '')}"
+
+def _stored_meta_or_raise(ticker: str, prediction_days: int = None):
+    meta = stored_model_meta(ticker, prediction_days)
+    if meta is None:
+        raise FileNotFoundError(f"Model or scaler not found for {ticker}. Please train the model first.")
+    return meta
+
+def holdout_backtest(meta, df: pd.DataFrame, num_days: int = BACKTEST_DAYS):
+    """
+    backtest_predictions() of the holdout model stored with `meta`, over the bars after
+    its last training bar (at most the last `num_days`), none of which it was trained on.
+    Returns (dates, actual, predicted, previous closes).
+    Raises FileNotFoundError for a model trained without a holdout, like for no model.
+    """
+    paths = meta['paths']
+    last_bar = meta.get('holdout_last_bar')
+    if not last_bar or not all(os.path.exists(paths.get(k) or '') for k in ('holdout_model', 'holdout_scaler')):
+        raise FileNotFoundError(f"No holdout model for {meta.get('ticker')}; retrain it for out-of-sample metrics")
+    unseen = len(df) - df.index.searchsorted(pd.Timestamp(last_bar), side='right')
+    days = min(num_days, unseen, len(df) - WINDOW_SIZE)
+    if days <= 0:
+        raise ValueError(f"No bars after the holdout model's last training bar {last_bar}")
+
+    model, scaler = model_cache.get(paths['holdout_model'], paths['holdout_scaler'])
+    close = df['Close'].to_numpy(dtype='float64')
+    actual, predicted = backtest_predictions(model, scaler, close, days)
+    return df.index[-days:], actual, predicted, close[-days - 1:-1]
+
+def backtest_stored_model(ticker: str, prediction_days: int = None, num_days: int = BACKTEST_DAYS):
+    """holdout_backtest() for the model stored_model_meta() picks; returns (actual, predicted)."""
+    meta = _stored_meta_or_raise(ticker, prediction_days)
+    _, actual, predicted, _ = holdout_backtest(meta, fetch_stock_data(ticker), num_days)
+    return actual, predicted
+
+def stored_backtest(ticker: str, prediction_days: int = None, num_days: int = BACKTEST_DAYS) -> dict:
+    """
+    Out-of-sample backtest of the stored model: one batched one-step-ahead prediction
+    per 60-day window ending before each bar the holdout model was not trained on,
+    with error metrics. Cached per model version and price data version.
+    """
+    meta = _stored_meta_or_raise(ticker, prediction_days)
+    df = fetch_stock_data(ticker)
+    key = (ticker, meta.get('prediction_days'), num_days, model_version(meta), data_version(df))
+    result = backtest_cache.get(key)
+    if result is not None:
+        count('backtest', 'hit')
+        return result
+    count('backtest', 'miss')
+
+    dates, actual, predicted, previous = holdout_backtest(meta, df, num_days)
+    result = {
+        'ticker': ticker,
+        'prediction_days': meta.get('prediction_days'),
+        'model_version': model_version(meta),
+        'metrics': backtest_metrics(actual, predicted, previous, in_sample=False),
+        'series': {
+            'dates': dates.strftime('%Y-%m-%d').tolist(),
+            'actual': np.round(actual, 2).tolist(),
+            'predicted': np.round(predicted, 2).tolist(),
+        },
+    }
+    backtest_cache.put(key, result)
+    return result
+
+@timed('forecast')
+def predict_next_days(ticker: str, prediction_days: int = 30):
+    try:
+        meta = stored_model_meta(ticker, prediction_days)
+        if meta is None:
             raise FileNotFoundError(f"Model or scaler not found for {ticker}. Please train the model first.")
+        model, scaler = model_cache.get(meta['paths']['model'], meta['paths']['scaler'])
 
-        df = fetch_stock_data(ticker)
-        close_prices = df['Close'].values.reshape(-1, 1)
+        close_prices = fetch_close_prices(ticker).reshape(-1, 1)
 
         if len(close_prices) < 60:
             raise ValueError(f"Insufficient data for prediction. Required: 60+, Found: {len(close_prices)}")
 
-        scaler = joblib.load(scaler_path)
         scaled_data = scaler.transform(close_prices)
-        model = load_model(model_path)
 
         last_60 = scaled_data[-60:]
         forecast = recursive_forecast(model, last_60, scaler, prediction_days)
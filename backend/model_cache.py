@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+def _file_signature(path: str):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModelCache:
+    """
+    In-memory LRU cache of loaded (model, scaler) pairs keyed by their file paths.
+
+    Each entry remembers the mtime and size of the `.h5` and `.pkl` files it was
+    loaded from; if either file changes on disk (e.g. after retraining) the entry
+    is reloaded on the next access. At most `max_size` pairs are kept.
+    """
+
+    def __init__(self, loader, max_size: int = 8):
+        self._loader = loader
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _signature(self, model_path: str, scaler_path: str):
+        return _file_signature(model_path), _file_signature(scaler_path)
+
+    def get(self, model_path: str, scaler_path: str):
+        """
+        Returns the (model, scaler) pair for the given files, loading it with the
+        cache's loader on a miss or when the files changed since the last load.
+        """
+        key = (model_path, scaler_path)
+        signature = self._signature(model_path, scaler_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Load outside the lock so one slow deserialization does not block
+        # lookups for other tickers.
+        pair = self._loader(model_path, scaler_path)
+        self.put(model_path, scaler_path, pair, signature)
+        return pair
+
+    def put(self, model_path: str, scaler_path: str, pair, signature=None):
+        """
+        Stores an already loaded pair, e.g. a model that was just trained and saved.
+        """
+        if signature is None:
+            signature = self._signature(model_path, scaler_path)
+        key = (model_path, scaler_path)
+        with self._lock:
+            self._entries[key] = (signature, pair)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model_path: str = None, scaler_path: str = None):
+        with self._lock:
+            if model_path is None and scaler_path is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if model_path in k or scaler_path in k]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,356 @@
+import os
+import re
+import importlib.util
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from metrics import count, timed, yfinance_call
+
+# Checked without importing: pyarrow is only loaded by pandas on first parquet read/write.
+HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread-level locking only
+    fcntl = None
+
+logger = logging.getLogger('stockwave')
+
+DATA_DIR = 'stock_data'
+os.makedirs(DATA_DIR, exist_ok=True)
+
+_TICKER_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.\-=^]{0,19}$')
+
+# Histories are stored as typed Parquet when pyarrow is installed, so loading is a
+# column read rather than a CSV + date parse; CSV files from older deployments are
+# migrated on first read. Set PRICE_CACHE_FORMAT=csv to keep plain CSV.
+CACHE_FORMAT = os.environ.get('PRICE_CACHE_FORMAT', 'parquet' if HAS_PARQUET else 'csv')
+
+# How long a cached history is served before its tail is refreshed, by period.
+# Daily-bar periods only gain one bar per session; short periods are intraday-ish.
+PERIOD_TTL = {
+    '1d': 5 * 60,
+    '5d': 15 * 60,
+    '1mo': 60 * 60,
+}
+DEFAULT_TTL = 6 * 60 * 60
+
+# A stored bar that differs from Yahoo's copy by more than this means the history
+# was re-adjusted (split or dividend) and must be downloaded again in full.
+ADJUSTMENT_TOLERANCE = 1e-4
+
+# After a failed refresh the stale cache is served without retrying for this long,
+# so an outage does not add a network timeout to every request.
+RETRY_AFTER = 5 * 60
+
+_failed_refreshes = {}
+
+_entry_locks = {}
+_entry_locks_guard = threading.Lock()
+
+
+def normalize_ticker(ticker: str, is_india: bool = False) -> str:
+    """
+    Canonical form of a ticker symbol: upper case, stripped, and with '.NS' appended
+    for Indian stocks unless it already has an NSE/BSE suffix. Raises ValueError for
+    anything that is not a plausible symbol, since it ends up in a file name.
+    """
+    ticker = (ticker or '').upper().strip()
+    if is_india and not ticker.endswith(('.NS', '.BO')):
+        ticker += '.NS'
+    if not _TICKER_PATTERN.match(ticker):
+        raise ValueError(f"Invalid ticker symbol: {ticker!r}")
+    return ticker
+
+
+def cache_path(ticker: str, period: str) -> str:
+    """Cache file for a canonical ticker; dots become underscores (SBIN.NS -> SBIN_NS_2y)."""
+    return os.path.join(DATA_DIR, f"{ticker.replace('.', '_')}_{period}.csv")
+
+
+@contextmanager
+def _entry_lock(filepath: str):
+    """
+    Serializes refreshes of one cache entry: a thread lock for requests in this
+    process, plus an flock on a sidecar file for other worker processes. Whoever
+    gets the lock second finds the entry already refreshed and just reads it.
+    """
+    with _entry_locks_guard:
+        lock = _entry_locks.setdefault(filepath, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{os.path.splitext(filepath)[0]}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _atomic_write(path: str, write):
+    """Calls write(tmp_path) and renames the result over `path`, so readers never see a partial file."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def period_ttl(period: str) -> int:
+    return PERIOD_TTL.get(period, DEFAULT_TTL)
+
+
+def _period_offset(period: str):
+    if period.endswith('mo'):
+        return pd.DateOffset(months=int(period[:-2]))
+    if period.endswith('y'):
+        return pd.DateOffset(years=int(period[:-1]))
+    if period.endswith('d'):
+        return pd.DateOffset(days=int(period[:-1]))
+    return None  # 'max', 'ytd': never trim
+
+
+def normalize_index(df: pd.DataFrame) -> pd.DataFrame:
+    """Makes the index a tz-naive DatetimeIndex so cached and fresh bars line up."""
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index, utc=True)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df
+
+
+def cache_paths(filepath: str) -> dict:
+    """Storage files for a cache entry; `filepath` may carry any extension."""
+    stem = os.path.splitext(filepath)[0]
+    return {
+        'csv': f"{stem}.csv",
+        'parquet': f"{stem}.parquet",
+        'close': f"{stem}.close.npy",
+    }
+
+
+def _stored_file(filepath: str):
+    paths = cache_paths(filepath)
+    if CACHE_FORMAT == 'parquet' and os.path.exists(paths['parquet']):
+        return paths['parquet']
+    if os.path.exists(paths['csv']):
+        return paths['csv']
+    return None
+
+
+def is_fresh(filepath: str, period: str) -> bool:
+    stored = _stored_file(filepath)
+    if stored is None:
+        return False
+    return time.time() - os.path.getmtime(stored) < period_ttl(period)
+
+
+def _touch(filepath: str):
+    stored = _stored_file(filepath)
+    if stored is not None:
+        os.utime(stored)
+
+
+def read_cache(filepath: str):
+    stored = _stored_file(filepath)
+    if stored is None:
+        return None
+    if stored.endswith('.parquet'):
+        return normalize_index(pd.read_parquet(stored))
+
+    df = normalize_index(pd.read_csv(stored, index_col=0, parse_dates=True))
+    if CACHE_FORMAT == 'parquet':
+        # One-off migration; keep the CSV's mtime so the TTL is not reset.
+        mtime = os.path.getmtime(stored)
+        write_cache(df, filepath)
+        os.utime(cache_paths(filepath)['parquet'], (mtime, mtime))
+    return df
+
+
+def _save_array(array: np.ndarray, path: str):
+    with open(path, 'wb') as f:
+        np.save(f, array)
+
+
+def write_cache(df: pd.DataFrame, filepath: str):
+    paths = cache_paths(filepath)
+    close = df['Close'].to_numpy(dtype='float64')
+    _atomic_write(paths['close'], lambda tmp: _save_array(close, tmp))
+    if CACHE_FORMAT == 'parquet':
+        _atomic_write(paths['parquet'], lambda tmp: df.to_parquet(tmp, engine='pyarrow'))
+    else:
+        _atomic_write(paths['csv'], df.to_csv)
+
+
+def load_close(ticker: str, period: str, filepath: str, download=None) -> np.ndarray:
+    """
+    Returns the Close column of the cached history as a read-only memory-mapped
+    float64 array. Worker processes mapping the same file share its pages, and
+    nothing is parsed. Falls back to load_prices() when the cache is stale.
+    """
+    close_path = cache_paths(filepath)['close']
+    if is_fresh(filepath, period) and os.path.exists(close_path):
+        count('close', 'hit')
+    else:
+        count('close', 'miss')
+        load_prices(ticker, period, filepath, download)
+        if not os.path.exists(close_path):
+            write_cache(read_cache(filepath), filepath)
+    return np.load(close_path, mmap_mode='r')
+
+
+def _download(ticker: str, **kwargs) -> pd.DataFrame:
+    import yfinance as yf
+    return yfinance_call('history', yf.Ticker(ticker).history, **kwargs)
+
+
+def _merge_tail(cached: pd.DataFrame, tail: pd.DataFrame, period: str):
+    """
+    Appends the bars in `tail` that come after the last complete cached bar.
+    Returns None if the overlapping bar disagrees, i.e. the cache is stale beyond
+    its tail and needs a full download.
+    """
+    anchor = cached.index[-2]
+    if anchor not in tail.index:
+        return None
+    stored, fresh = cached.at[anchor, 'Close'], tail.at[anchor, 'Close']
+    if not np.isclose(stored, fresh, rtol=ADJUSTMENT_TOLERANCE, atol=0):
+        return None
+
+    # The last cached bar may have been stored mid-session, so it is replaced too.
+    merged = pd.concat([cached.loc[cached.index <= anchor], tail.loc[tail.index > anchor]])
+    merged = merged[~merged.index.duplicated(keep='last')]
+    offset = _period_offset(period)
+    if offset is not None:
+        merged = merged.loc[merged.index >= merged.index[-1] - offset]
+    return merged
+
+
+def _can_serve(cached, filepath: str, period: str) -> bool:
+    if cached is None or len(cached) < 2:
+        return False
+    return is_fresh(filepath, period) or time.time() - _failed_refreshes.get(filepath, 0) < RETRY_AFTER
+
+
+def _refresh(ticker: str, period: str, filepath: str, cached, download) -> pd.DataFrame:
+    df = None
+    try:
+        if cached is not None and len(cached) >= 2:
+            start = cached.index[-2].strftime('%Y-%m-%d')
+            tail = download(ticker, start=start)
+            if tail.empty:
+                # No new bars (weekend, holiday); mark the cache as checked.
+                _touch(filepath)
+                return cached
+            df = _merge_tail(cached, normalize_index(tail), period)
+            if df is None:
+                logger.info(f"Price history for {ticker} was re-adjusted, downloading {period} again")
+
+        if df is None:
+            df = download(ticker, period=period)
+            if df.empty or 'Close' not in df.columns:
+                raise ValueError(f"No data or missing 'Close' prices for {ticker}.")
+            df = normalize_index(df)
+    except Exception as e:
+        if cached is None:
+            raise
+        logger.warning(f"Refresh failed for {ticker}, serving cached data: {e}")
+        _failed_refreshes[filepath] = time.time()
+        return cached
+
+    _failed_refreshes.pop(filepath, None)
+    logger.info(f"Cached {len(df)} bars for {ticker} through {df.index[-1]:%Y-%m-%d}")
+    write_cache(df, filepath)
+    return df
+
+
+def load_prices(ticker: str, period: str, filepath: str, download=None) -> pd.DataFrame:
+    """
+    Returns the OHLCV history for `ticker`, cached at `filepath`.
+
+    A cache younger than the period's TTL is returned as is. An older one is
+    refreshed by downloading only the bars since its last complete bar and
+    appending them; the full period is only downloaded when there is no cache or
+    Yahoo's overlapping bar shows the history was re-adjusted. If the refresh
+    fails the stale cache is served rather than failing the request.
+
+    Concurrent misses for the same entry trigger a single download; the other
+    callers wait for it and read the refreshed cache.
+
+    :param download: callable(ticker, **history_kwargs) -> DataFrame, yfinance by default.
+    """
+    download = download or _download
+    cached = read_cache(filepath)
+    if _can_serve(cached, filepath, period):
+        count('prices', 'hit')
+        return cached
+
+    with _entry_lock(filepath):
+        # Another thread or process may have refreshed the entry while we waited.
+        cached = read_cache(filepath)
+        if _can_serve(cached, filepath, period):
+            count('prices', 'hit')
+            return cached
+        count('prices', 'miss')
+        return _refresh(ticker, period, filepath, cached, download)
+
+
+def store_history(df: pd.DataFrame, filepath: str):
+    """Replaces the cache entry at `filepath` with a downloaded history, e.g. from a bulk refresh."""
+    with _entry_lock(filepath):
+        write_cache(df, filepath)
+
+
+def _migrate_dotted_cache(ticker: str, period: str, filepath: str):
+    # stock_data.fetch_stock_data used to keep the dot (SBIN.NS_2y.csv).
+    legacy = os.path.join(DATA_DIR, f"{ticker}_{period}.csv")
+    if legacy != filepath and os.path.exists(legacy) and _stored_file(filepath) is None:
+        os.replace(legacy, filepath)
+
+
+def fetch_stock_data(ticker: str, period: str = '2y', is_india: bool = False) -> pd.DataFrame:
+    """
+    Fetches historical OHLCV data for a ticker through the shared price cache.
+    This is the single entry point used by the model and the API.
+
+    Parameters:
+    - ticker: stock symbol (without suffix for Indian stocks if is_india is set)
+    - period: data period like '1mo', '2y', etc.
+    - is_india: if True, appends '.NS' suffix for Indian NSE stocks automatically.
+
+    Raises ValueError if the ticker is malformed or no data can be obtained.
+    """
+    ticker = normalize_ticker(ticker, is_india)
+    filepath = cache_path(ticker, period)
+    try:
+        _migrate_dotted_cache(ticker, period, filepath)
+        with timed('fetch_prices'):
+            return load_prices(ticker, period, filepath)
+    except Exception as e:
+        logger.error(f"Failed to fetch data for {ticker}: {e}")
+        raise ValueError(f"Invalid or unsupported ticker: {ticker}")
+
+
+def fetch_close_prices(ticker: str, period: str = '2y', is_india: bool = False) -> np.ndarray:
+    """Close prices only, memory-mapped from the price cache without loading the full frame."""
+    ticker = normalize_ticker(ticker, is_india)
+    filepath = cache_path(ticker, period)
+    try:
+        _migrate_dotted_cache(ticker, period, filepath)
+        return load_close(ticker, period, filepath)
+    except Exception as e:
+        logger.error(f"Failed to fetch close prices for {ticker}: {e}")
+        raise ValueError(f"Invalid or unsupported ticker: {ticker}")
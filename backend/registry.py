@@ -0,0 +1,163 @@
+import os
+import json
+import glob
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread-level locking only
+    fcntl = None
+
+
+def data_version(df) -> str:
+    """
+    Returns a short fingerprint of the price history a model is trained on.
+    Two frames with the same bars (to 6 decimal places) get the same version,
+    so a CSV round trip does not look like new data.
+    """
+    close = np.round(df['Close'].to_numpy(dtype='float64'), 6)
+    digest = hashlib.sha1(close.tobytes()).hexdigest()[:12]
+    last_bar = df.index[-1].strftime('%Y%m%d') if len(df) else 'empty'
+    return f"{last_bar}-{len(df)}-{digest}"
+
+
+class ModelRegistry:
+    """
+    Keeps trained models and scalers on disk keyed by ticker and horizon, with a
+    JSON metadata file recording the data version and hyperparameters each one
+    was trained with. A stored model is only served when both still match.
+    """
+
+    def __init__(self, model_dir: str):
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        self._slot_locks = {}
+        self._slot_depth = {}
+        os.makedirs(model_dir, exist_ok=True)
+
+    @staticmethod
+    def _safe(ticker: str) -> str:
+        return ticker.upper().strip().replace('.', '_')
+
+    def paths(self, ticker: str, prediction_days: int) -> dict:
+        stem = os.path.join(self.model_dir, f"{self._safe(ticker)}_{prediction_days}d")
+        return {
+            'model': f"{stem}_lstm_model.h5",
+            'scaler': f"{stem}_scaler.pkl",
+            'meta': f"{stem}_meta.json",
+            # Same model trained without the last bars, which the backtest scores
+            'holdout_model': f"{stem}_holdout_model.h5",
+            'holdout_scaler': f"{stem}_holdout_scaler.pkl",
+        }
+
+    @contextmanager
+    def lock(self, ticker: str, prediction_days: int):
+        """
+        Serializes training of one registry slot: a reentrant thread lock for this
+        process plus an flock on a sidecar file for other processes (web workers,
+        train_all.py), so two trainings never write the same model files at once.
+        """
+        path = f"{os.path.splitext(self.paths(ticker, prediction_days)['meta'])[0]}.lock"
+        with self._lock:
+            slot = self._slot_locks.setdefault(path, threading.RLock())
+        with slot:
+            # Only the thread holding `slot` touches its depth.
+            depth = self._slot_depth.get(path, 0)
+            self._slot_depth[path] = depth + 1
+            try:
+                if depth or fcntl is None:
+                    yield
+                    return
+                with open(path, 'a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+            finally:
+                self._slot_depth[path] = depth
+
+    def legacy_paths(self, ticker: str) -> dict:
+        stem = os.path.join(self.model_dir, self._safe(ticker))
+        return {
+            'model': f"{stem}_lstm_model.h5",
+            'scaler': f"{stem}_scaler.pkl",
+            'meta': None,
+        }
+
+    def _read_meta(self, meta_path: str):
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def meta(self, ticker: str, prediction_days: int):
+        """Returns the stored metadata for (ticker, prediction_days), fresh or not, or None."""
+        return self._read_meta(self.paths(ticker, prediction_days)['meta'])
+
+    def lookup(self, ticker: str, prediction_days: int, version: str, hyperparams: dict):
+        """
+        Returns the metadata of the stored model for (ticker, prediction_days) if it
+        was trained on `version` with `hyperparams` and its files are present,
+        otherwise None.
+        """
+        paths = self.paths(ticker, prediction_days)
+        meta = self.meta(ticker, prediction_days)
+        if not meta:
+            return None
+        if meta.get('data_version') != version or meta.get('hyperparams') != hyperparams:
+            return None
+        if not (os.path.exists(paths['model']) and os.path.exists(paths['scaler'])):
+            return None
+        return dict(meta, paths=paths)
+
+    def record(self, ticker: str, prediction_days: int, version: str, hyperparams: dict, **extra) -> dict:
+        """
+        Writes the metadata for a freshly saved model. The write goes through a
+        temporary file so readers never see a half-written JSON document.
+        """
+        paths = self.paths(ticker, prediction_days)
+        meta = {
+            'ticker': ticker.upper().strip(),
+            'prediction_days': prediction_days,
+            'data_version': version,
+            'hyperparams': hyperparams,
+            'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            **extra,
+        }
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.model_dir, suffix='.json.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(meta, f, indent=2)
+            os.replace(tmp_path, paths['meta'])
+        return dict(meta, paths=paths)
+
+    def latest(self, ticker: str):
+        """
+        Returns the metadata (with paths) of the most recently trained model for a
+        ticker across all horizons, falling back to the pre-registry file names.
+        """
+        pattern = os.path.join(self.model_dir, f"{self._safe(ticker)}_*d_meta.json")
+        candidates = []
+        for meta_path in glob.glob(pattern):
+            meta = self._read_meta(meta_path)
+            # BRK_*d_meta.json also matches BRK_B_5d_meta.json
+            if not meta or meta.get('ticker') != ticker.upper().strip():
+                continue
+            paths = self.paths(ticker, meta['prediction_days'])
+            if os.path.exists(paths['model']) and os.path.exists(paths['scaler']):
+                candidates.append(dict(meta, paths=paths))
+        if candidates:
+            return max(candidates, key=lambda m: m.get('trained_at', ''))
+
+        paths = self.legacy_paths(ticker)
+        if os.path.exists(paths['model']) and os.path.exists(paths['scaler']):
+            return {'ticker': ticker.upper().strip(), 'paths': paths}
+        return None
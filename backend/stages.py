@@ -0,0 +1,117 @@
+"""
+Runs the stages of a request as a small dependency graph on a shared thread pool,
+so independent work (company info, chart rendering, model inference) overlaps and
+a request takes about as long as its slowest chain of stages rather than the sum.
+
+Each stage has its own timeout and a fallback value. A stage that fails or runs
+out of time gets its fallback, and so does every stage that depends on it; the
+run only raises when a stage without a fallback fails. A timed-out stage keeps
+running in the pool until it finishes, but its result is discarded.
+"""
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger('stockwave')
+
+STAGE_WORKERS = int(os.environ.get('STAGE_WORKERS', 8))
+
+# Marks a stage whose failure fails the whole run.
+REQUIRED = object()
+
+
+class Stage:
+    """One unit of work: fn is called with the results of `deps`, in order."""
+
+    def __init__(self, name: str, fn, deps=(), timeout: float = None, fallback=REQUIRED):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class StageRun:
+    """Results of a run: values by stage name, failures with their reason, and timings in ms."""
+
+    def __init__(self):
+        self.results = {}
+        self.failed = {}
+        self.timings = {}
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    def _fail(self, stage: Stage, reason: str, error: Exception = None):
+        if stage.fallback is REQUIRED:
+            if error is None:
+                raise TimeoutError(f"Stage {stage.name} {reason}")
+            raise error
+        logger.warning(f"Stage {stage.name} {reason}, using fallback")
+        self.failed[stage.name] = reason
+        self.results[stage.name] = stage.fallback
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix='stage')
+    return _pool
+
+
+def run_stages(stages, pool: ThreadPoolExecutor = None) -> StageRun:
+    """
+    Starts every stage as soon as its dependencies have finished and waits until
+    all of them have a result or a fallback. Must not be called from a pool thread.
+    """
+    pool = pool or get_pool()
+    run = StageRun()
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    while pending or running:
+        for name, stage in list(pending.items()):
+            if any(dep in run.failed for dep in stage.deps):
+                del pending[name]
+                run._fail(stage, 'skipped: a dependency failed')
+            elif all(dep in run.results for dep in stage.deps):
+                del pending[name]
+                args = [run.results[dep] for dep in stage.deps]
+                started = time.perf_counter()
+                deadline = started + stage.timeout if stage.timeout else None
+                # Stages see the caller's context, e.g. its per-request timings.
+                future = pool.submit(contextvars.copy_context().run, stage.fn, *args)
+                running[future] = (stage, started, deadline)
+        if not running:
+            if pending:
+                raise ValueError(f"Unknown or circular dependencies: {', '.join(pending)}")
+            break
+
+        deadlines = [deadline for _, _, deadline in running.values() if deadline]
+        timeout = max(0, min(deadlines) - time.perf_counter()) if deadlines else None
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        now = time.perf_counter()
+        for future, (stage, started, deadline) in list(running.items()):
+            if future in done:
+                del running[future]
+                run.timings[stage.name] = (now - started) * 1000
+                error = future.exception()
+                if error is None:
+                    run.results[stage.name] = future.result()
+                else:
+                    run._fail(stage, f"failed: {error}", error)
+            elif deadline and now >= deadline:
+                del running[future]
+                run.timings[stage.name] = (now - started) * 1000
+                run._fail(stage, f"timed out after {stage.timeout}s")
+    return run
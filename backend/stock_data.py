@@ -1,109 +1,36 @@
-import os
-import yfinance as yf
-import pandas as pd
+# Historical prices come from the shared data-access layer; re-exported here
+from price_cache import DATA_DIR, fetch_stock_data
 
-DATA_DIR = 'stock_data'
-
-# Ensure the data directory exists
-os.makedirs(DATA_DIR, exist_ok=True)
+from symbols import DEFAULT_LIMIT, get_symbol_index
+from market_snapshot import MarketSnapshot
+from fundamentals import FIELDS, MISSING, get_store
 
 # Predefined trending tickers
 TRENDING_TICKERS = ['AAPL', 'TSLA', 'AMZN', 'GOOGL', 'NFLX', 'NVDA', 'INTC', 'BA', 'SPY', 'XOM']
+LOSER_TICKERS = ['BA', 'XOM', 'NVDA', 'GOOGL', 'AMZN', 'NFLX', 'INTC']
+
+# Quotes for both dashboard lists, refreshed in the background
+market_snapshot = MarketSnapshot(TRENDING_TICKERS + LOSER_TICKERS)
 
 def fetch_company_info(ticker: str) -> dict:
     """
-    Fetches company info such as name, sector, and description using yfinance.
+    Returns company info such as name, sector, and description from the local
+    fundamentals store, which downloads it with yfinance and keeps it fresh.
     Returns a dictionary with keys: name, sector, industry, website, description, marketCap.
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        return {
-            "name": info.get("shortName", "N/A"),
-            "sector": info.get("sector", "N/A"),
-            "industry": info.get("industry", "N/A"),
-            "website": info.get("website", "N/A"),
-            "description": info.get("longBusinessSummary", "N/A"),
-            "marketCap": info.get("marketCap", "N/A"),
-        }
+        return get_store().get(ticker)
     except Exception as e:
         print(f"Error fetching company info for {ticker}: {e}")
-        return {
-            "name": "N/A",
-            "sector": "N/A",
-            "industry": "N/A",
-            "website": "N/A",
-            "description": "N/A",
-            "marketCap": "N/A",
-        }
-
-def fetch_stock_data(ticker: str, period: str = '2y', is_india: bool = False) -> pd.DataFrame:
-    """
-    Fetches historical stock data for the given ticker and period.
-    Caches data locally as CSV in DATA_DIR to avoid redundant downloads.
-    Ensures the DataFrame index is a DatetimeIndex.
-    
-    Parameters:
-    - ticker: stock symbol (without suffix for Indian stocks)
-    - period: data period like '1mo', '2y', etc.
-    - is_india: if True, appends '.NS' suffix for Indian NSE stocks automatically.
-    """
-    if is_india:
-        if not ticker.upper().endswith('.NS') and not ticker.upper().endswith('.BO'):
-            ticker = ticker.upper() + '.NS'
-        else:
-            ticker = ticker.upper()
-    else:
-        ticker = ticker.upper()
-
-    filepath = os.path.join(DATA_DIR, f"{ticker}_{period}.csv")
-
-    if os.path.exists(filepath):
-        print(f"Loading cached data from {filepath}")
-        df = pd.read_csv(filepath, index_col=0, parse_dates=True)
-    else:
-        print(f"Fetching new data for {ticker}")
-        df = yf.Ticker(ticker).history(period=period)
-        if df.empty or 'Close' not in df.columns:
-            raise ValueError(f"No historical data found or 'Close' prices missing for {ticker}.")
-        df.to_csv(filepath)
-
-    # Ensure the index is a DatetimeIndex
-    if not isinstance(df.index, pd.DatetimeIndex):
-        df.index = pd.to_datetime(df.index)
-
-    return df
+        return {field: MISSING for field in FIELDS}
 
 def _get_stock_changes(ticker_list: list[str]) -> list[dict]:
     """
-    Internal helper function to compute current price and percentage change
-    for a list of tickers over the last trading day.
+    Internal helper function to return current price and percentage change
+    for a list of tickers over the last trading day, read from the market snapshot.
     """
     try:
-        # Download 1 day data with 1-minute intervals, grouped by ticker
-        tickers_data = yf.download(
-            tickers=" ".join(ticker_list),
-            period='1d',
-            interval='1m',
-            group_by='ticker',
-            threads=True,
-            progress=False
-        )
-        data = []
-        for symbol in ticker_list:
-            df = tickers_data.get(symbol)
-            if df is not None and not df.empty:
-                current = round(df['Close'].iloc[-1], 2)
-                opening = round(df['Open'].iloc[0], 2)
-                change = round(((current - opening) / opening) * 100, 2)
-                data.append({
-                    'symbol': symbol,
-                    'price': current,
-                    'change': f"{'+' if change >= 0 else ''}{change}%",
-                })
-            else:
-                print(f"No recent data for {symbol}")
-        return data
+        return market_snapshot.quotes(ticker_list)
     except Exception as e:
         print(f"Error fetching data for tickers: {e}")
         return []
@@ -118,20 +45,22 @@ def get_top_losers() -> list[dict]:
     """
     Returns current price and % change for predefined losing tickers.
     """
-    losers = ['BA', 'XOM', 'NVDA', 'GOOGL', 'AMZN', 'NFLX', 'INTC']
-    return _get_stock_changes(losers)
+    return _get_stock_changes(LOSER_TICKERS)
+
+def get_sp500_symbols() -> list[str]:
+    """
+    Returns the S&P 500 ticker symbols from the symbol index used by search_tickers.
+    """
+    return get_symbol_index().symbols()
 
-def search_tickers(query: str) -> list[dict]:
+def search_tickers(query: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
     """
-    Searches the S&P 500 ticker dataset for matching symbols containing the query string.
-    Returns a list of dicts with keys: 'symbol' and 'name'.
+    Searches the S&P 500 symbol index for tickers and company names matching the query.
+    Exact symbols rank first, then symbol prefixes, company-name word prefixes and
+    symbol substrings. Returns at most `limit` dicts with keys: 'symbol' and 'name'.
     """
     try:
-        SYMBOL_LOOKUP = pd.read_csv(
-            "https://raw.githubusercontent.com/datasets/s-and-p-500-companies/master/data/constituents.csv"
-        )
-        matches = SYMBOL_LOOKUP[SYMBOL_LOOKUP['Symbol'].str.contains(query, case=False, na=False)]
-        return matches[['Symbol', 'Name']].rename(columns={'Symbol': 'symbol', 'Name': 'name'}).to_dict(orient='records')
+        return get_symbol_index().search(query, limit)
     except Exception as e:
         print(f"Error during ticker search: {e}")
         return []
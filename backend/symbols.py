@@ -0,0 +1,144 @@
+import os
+import csv
+import time
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger('stockwave')
+
+SP500_CONSTITUENTS_URL = "https://raw.githubusercontent.com/datasets/s-and-p-500-companies/master/data/constituents.csv"
+
+# Bundled copy of the constituents list so search works with no network.
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sp500_constituents.csv')
+
+# Set SYMBOLS_REFRESH_SECONDS to re-download the list in the background; 0 keeps the snapshot.
+REFRESH_SECONDS = int(os.environ.get('SYMBOLS_REFRESH_SECONDS', 0))
+
+DEFAULT_LIMIT = 10
+
+_HIGH = '\U0010ffff'
+
+
+class SymbolIndex:
+    """
+    In-memory index over (symbol, name) pairs.
+
+    Symbols and the upper-cased words of company names are kept in sorted arrays,
+    so prefix lookups are two bisections. Results are ranked: exact symbol, symbol
+    prefix, company-name word prefix, then symbol substring.
+    """
+
+    def __init__(self, records):
+        self._names = {}
+        for symbol, name in records:
+            symbol = symbol.upper().strip()
+            if symbol:
+                self._names[symbol] = (name or '').strip()
+        self._symbols = sorted(self._names)
+        tokens = set()
+        for symbol, name in self._names.items():
+            for token in name.upper().replace(',', ' ').replace('.', ' ').split():
+                tokens.add((token, symbol))
+        self._tokens = sorted(tokens)
+        self._token_keys = [token for token, _ in self._tokens]
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self._names
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def symbols(self) -> list[str]:
+        return list(self._symbols)
+
+    def name(self, symbol: str):
+        return self._names.get(symbol)
+
+    def _prefix_range(self, keys, prefix):
+        return bisect.bisect_left(keys, prefix), bisect.bisect_left(keys, prefix + _HIGH)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+        query = (query or '').upper().strip()
+        if not query or limit <= 0:
+            return []
+
+        seen = set()
+        results = []
+
+        def add(symbols):
+            for symbol in sorted(symbols, key=lambda s: (len(s), s)):
+                if symbol not in seen:
+                    seen.add(symbol)
+                    results.append({'symbol': symbol, 'name': self._names[symbol]})
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        if query in self._names and add([query]):
+            return results
+
+        lo, hi = self._prefix_range(self._symbols, query)
+        if add(self._symbols[lo:hi]):
+            return results
+
+        lo, hi = self._prefix_range(self._token_keys, query)
+        if add(symbol for _, symbol in self._tokens[lo:hi]):
+            return results
+
+        add(symbol for symbol in self._symbols if query in symbol)
+        return results
+
+
+def _read_records(rows) -> list[tuple]:
+    records = []
+    for row in rows:
+        symbol = (row.get('Symbol') or '').strip()
+        # Yahoo writes share classes with a dash (BRK-B); the upstream list uses a dot.
+        records.append((symbol.replace('.', '-'), row.get('Name') or row.get('Security') or ''))
+    return records
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> SymbolIndex:
+    with open(path, newline='') as f:
+        return SymbolIndex(_read_records(csv.DictReader(f)))
+
+
+def download_index(url: str = SP500_CONSTITUENTS_URL) -> SymbolIndex:
+    import io
+    import requests
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    return SymbolIndex(_read_records(csv.DictReader(io.StringIO(response.text))))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _refresh_loop():
+    global _index
+    while True:
+        time.sleep(REFRESH_SECONDS)
+        try:
+            fresh = download_index()
+            if len(fresh):
+                _index = fresh
+                logger.info(f"Refreshed symbol index ({len(fresh)} symbols)")
+        except Exception as e:
+            logger.warning(f"Symbol index refresh failed, keeping current index: {e}")
+
+
+def get_symbol_index() -> SymbolIndex:
+    """
+    Returns the process-wide symbol index, loading the bundled snapshot on first use
+    and starting the background refresh if SYMBOLS_REFRESH_SECONDS is set.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_snapshot()
+                if REFRESH_SECONDS > 0:
+                    threading.Thread(target=_refresh_loop, name='symbols-refresh', daemon=True).start()
+    return _index
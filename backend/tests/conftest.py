@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The backend is a flat set of modules run from its own directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+
+@pytest.fixture
+def prices(tmp_path, monkeypatch):
+    """300 bars of a random walk, served to model.py with its registry in a scratch directory."""
+    import model
+    from registry import ModelRegistry
+
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, 300))
+    index = pd.bdate_range(end='2026-10-16', periods=len(close), name='Date')
+    df = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1000}, index=index)
+    monkeypatch.setattr(model, 'registry', ModelRegistry(str(tmp_path)))
+    monkeypatch.setattr(model, 'fetch_stock_data', lambda ticker: df)
+    return df
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('keras')
+
+import model
+from backtest import HOLDOUT_DAYS
+
+
+def test_backtest_scores_only_bars_the_holdout_model_did_not_see(prices):
+    model.train_lstm_model('TEST', 1, epochs=1, df=prices, warm_start=False)
+    meta = model.stored_model_meta('TEST', 1)
+    assert meta['holdout_last_bar'] == prices.index[-HOLDOUT_DAYS - 1].strftime('%Y-%m-%d')
+
+    result = model.stored_backtest('TEST', 1)
+    assert result['metrics']['in_sample'] is False
+    assert result['metrics']['days'] == HOLDOUT_DAYS
+    assert min(result['series']['dates']) > meta['holdout_last_bar']
+    assert result['series']['actual'] == list(np.round(prices['Close'].to_numpy()[-HOLDOUT_DAYS:], 2))
+
+    # Capped at num_days, most recent bars first
+    result = model.stored_backtest('TEST', 1, num_days=10)
+    assert result['series']['dates'] == prices.index[-10:].strftime('%Y-%m-%d').tolist()
+
+
+def test_model_without_holdout_has_no_backtest(prices):
+    model.train_lstm_model('TEST', 1, epochs=1, df=prices, warm_start=False)
+    meta = model.stored_model_meta('TEST', 1)
+    with pytest.raises(FileNotFoundError, match='holdout'):
+        model.holdout_backtest(dict(meta, holdout_last_bar=None), prices)
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bulk_download
+import price_cache
+from bulk_download import FixtureProvider, bulk_refresh
+
+
+def history(seed: int, bars: int = 80) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, bars))
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=bars, name='Date')
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1000}, index=index)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / 'stock_data'
+    directory.mkdir()
+    monkeypatch.setattr(price_cache, 'DATA_DIR', str(directory))
+    monkeypatch.setattr(price_cache, '_download', lambda *args, **kwargs: pytest.fail('network access'))
+    return directory
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    directory = tmp_path / 'fixtures'
+    directory.mkdir()
+    frames = {}
+    for seed, symbol in enumerate(['AAPL', 'MSFT', 'SBIN.NS', 'TSLA', 'NVDA']):
+        frames[symbol] = history(seed)
+        frames[symbol].to_csv(directory / f"{symbol.replace('.', '_')}_2y.csv")
+    return str(directory), frames
+
+
+class CountingProvider:
+    """Wraps a provider, recording every chunk and failing the first `failures` calls for `flaky`."""
+
+    def __init__(self, provider, flaky=(), failures=0):
+        self.provider = provider
+        self.flaky = set(flaky)
+        self.failures = failures
+        self.chunks = []
+
+    def __call__(self, symbols, period):
+        self.chunks.append(list(symbols))
+        if self.flaky & set(symbols) and self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError('rate limited')
+        return self.provider(symbols, period)
+
+
+def refresh(tickers, provider, **kwargs):
+    kwargs = {'chunk_size': 2, 'workers': 2, 'retries': 1, 'backoff': 0, 'rate': 0, **kwargs}
+    return bulk_refresh(tickers, '2y', provider, **kwargs)
+
+
+def test_stores_every_symbol_in_chunks(cache_dir, fixtures):
+    directory, frames = fixtures
+    provider = CountingProvider(FixtureProvider(directory))
+
+    report = refresh(['aapl', 'MSFT', 'sbin.ns', 'TSLA', 'NVDA', 'AAPL'], provider)
+
+    assert sorted(report['stored']) == sorted(frames)
+    assert report['fresh'] == report['missing'] == report['failed'] == []
+    assert sorted(len(chunk) for chunk in provider.chunks) == [1, 2, 2]
+    assert sorted(s for chunk in provider.chunks for s in chunk) == sorted(frames)
+    for symbol, frame in frames.items():
+        cached = price_cache.fetch_stock_data(symbol)
+        np.testing.assert_allclose(cached['Close'].to_numpy(), frame['Close'].to_numpy())
+
+
+def test_fresh_entries_are_skipped_unless_forced(cache_dir, fixtures):
+    directory, _ = fixtures
+    refresh(['AAPL', 'MSFT'], FixtureProvider(directory))
+    provider = CountingProvider(FixtureProvider(directory))
+
+    report = refresh(['AAPL', 'MSFT', 'TSLA'], provider)
+    assert report['fresh'] == ['AAPL', 'MSFT']
+    assert report['stored'] == ['TSLA']
+    assert provider.chunks == [['TSLA']]
+
+    report = refresh(['AAPL', 'MSFT'], provider, force=True)
+    assert sorted(report['stored']) == ['AAPL', 'MSFT']
+
+
+def test_failed_chunk_is_retried(cache_dir, fixtures):
+    directory, _ = fixtures
+    provider = CountingProvider(FixtureProvider(directory), flaky=['TSLA'], failures=1)
+
+    report = refresh(['AAPL', 'MSFT', 'TSLA', 'NVDA'], provider)
+
+    assert sorted(report['stored']) == ['AAPL', 'MSFT', 'NVDA', 'TSLA']
+    assert report['failed'] == []
+    assert sum('TSLA' in chunk for chunk in provider.chunks) == 2
+
+
+def test_chunk_failing_every_retry_is_reported_alone(cache_dir, fixtures):
+    directory, _ = fixtures
+    provider = CountingProvider(FixtureProvider(directory), flaky=['TSLA'], failures=10)
+
+    report = refresh(['AAPL', 'MSFT', 'TSLA', 'NVDA'], provider, retries=2)
+
+    assert sorted(report['failed']) == ['NVDA', 'TSLA']
+    assert sorted(report['stored']) == ['AAPL', 'MSFT']
+    assert sum('TSLA' in chunk for chunk in provider.chunks) == 3
+    assert price_cache.read_cache(price_cache.cache_path('TSLA', '2y')) is None
+
+
+def test_malformed_and_unknown_symbols_are_reported(cache_dir, fixtures):
+    directory, _ = fixtures
+
+    report = refresh(['AAPL', '../etc/passwd', 'ZZZZ', ''], FixtureProvider(directory))
+
+    assert report['stored'] == ['AAPL']
+    assert report['missing'] == ['ZZZZ']
+    assert sorted(report['failed']) == ['', '../etc/passwd']
+
+
+def test_main_exits_nonzero_on_failures(cache_dir, fixtures, capsys):
+    directory, _ = fixtures
+
+    assert bulk_download.main(['AAPL', '--fixtures', directory, '--rate', '0']) == 0
+    assert bulk_download.main(['AAPL', 'bad symbol', '--fixtures', directory, '--rate', '0']) == 1
+    assert "failed: bad symbol" in capsys.readouterr().out
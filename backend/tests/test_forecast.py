@@ -0,0 +1,44 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+pytest.importorskip('keras')
+
+import forecast
+from model import build_lstm_model
+from windows import WINDOW_SIZE
+
+
+def _forecast_ref():
+    model = build_lstm_model((WINDOW_SIZE, 1), 1)
+    forecast.forecast_scaled(model, np.zeros((1, WINDOW_SIZE), dtype=np.float32), 3)
+    assert model in forecast._forward_fns
+    return weakref.ref(model)
+
+
+def _export_ref(path):
+    from lstm_numpy import export
+
+    model = build_lstm_model((WINDOW_SIZE, 1), 1)
+    export(model, path)
+    return weakref.ref(model)
+
+
+def test_forecast_shape():
+    model = build_lstm_model((WINDOW_SIZE, 1), 1)
+    windows = np.random.default_rng(0).random((4, WINDOW_SIZE), dtype=np.float32)
+    assert forecast.forecast_scaled(model, windows, 5).shape == (4, 5)
+
+
+def test_model_is_freed_after_forecast():
+    ref = _forecast_ref()
+    gc.collect()
+    assert ref() is None
+
+
+def test_exported_model_is_freed(tmp_path):
+    ref = _export_ref(str(tmp_path / 'model.h5'))
+    gc.collect()
+    assert ref() is None
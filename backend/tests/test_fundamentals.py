@@ -0,0 +1,18 @@
+import fundamentals
+from fundamentals import MISSING, FundamentalsStore
+
+INFO = {'shortName': 'Apple Inc.', 'sector': 'Technology', 'marketCap': 3_000_000_000_000}
+
+
+def test_empty_info_is_not_stored(tmp_path, monkeypatch):
+    answers = [{}, INFO]
+    store = FundamentalsStore(str(tmp_path / 'fundamentals.sqlite'), download=lambda ticker: answers.pop(0))
+
+    assert store.get('AAPL') == {field: MISSING for field in fundamentals.FIELDS}
+    assert store._read('AAPL') == {}
+    # The failure is retried once RETRY_AFTER has passed, not after the fields' TTLs
+    monkeypatch.setattr(fundamentals, 'RETRY_AFTER', 0)
+    stored = store.get('AAPL')
+    assert stored['name'] == 'Apple Inc.'
+    assert stored['marketCap'] == 3_000_000_000_000
+    assert stored['website'] == MISSING
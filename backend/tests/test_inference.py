@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('keras')
+
+import inference
+from lstm_numpy import from_keras
+from model import build_lstm_model
+from windows import WINDOW_SIZE
+
+
+def _request(rows, op, days=None, seed=0):
+    windows = np.random.default_rng(seed).random((rows, WINDOW_SIZE), dtype=np.float32)
+    return {'windows': windows, 'op': op, 'days': days}
+
+
+@pytest.mark.parametrize('op', [inference.PREDICT, inference.FORECAST])
+def test_models_with_one_architecture_are_batched_together(op):
+    a, b = (from_keras(build_lstm_model((WINDOW_SIZE, 1), 1)) for _ in range(2))
+    days = [3, 10, 5, 1] if op == inference.FORECAST else [None] * 4
+    members = [(a, _request(1, op, days[0], 0)), (b, _request(4, op, days[1], 1)),
+               (a, _request(2, op, days[2], 2)), (b, _request(1, op, days[3], 3))]
+
+    results = inference._run_group(op, members)
+
+    for (model, request), result in zip(members, results):
+        if op == inference.PREDICT:
+            expected = model(request['windows'])
+        else:
+            expected = model.forecast_scaled(request['windows'], request['days'])
+        assert result.shape == expected.shape
+        np.testing.assert_allclose(result, expected, atol=1e-6)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('keras')
+
+import forecast
+from model import build_lstm_model
+from lstm_numpy import PARITY_TOLERANCE, NumpyLSTM, StackedLSTM, from_keras, export, load_exported, parity_error
+from windows import WINDOW_SIZE
+
+
+@pytest.fixture(scope='module', params=[1, 3], ids=['recursive', 'direct'])
+def models(request):
+    keras_model = build_lstm_model((WINDOW_SIZE, 1), request.param)
+    return keras_model, from_keras(keras_model)
+
+
+def _windows(batch, seed=0):
+    return np.random.default_rng(seed).random((batch, WINDOW_SIZE, 1), dtype=np.float32)
+
+
+@pytest.mark.parametrize('batch', [1, 2, 7, 64])
+def test_forward_matches_keras(models, batch):
+    keras_model, lstm = models
+    x = _windows(batch)
+    expected = np.asarray(keras_model(x, training=False))
+    np.testing.assert_allclose(lstm(x), expected, atol=PARITY_TOLERANCE)
+    np.testing.assert_allclose(lstm.predict(x), expected, atol=PARITY_TOLERANCE)
+
+
+@pytest.mark.parametrize('batch', [1, 3, 17])
+@pytest.mark.parametrize('days', [1, 2, 7, 30, 90])
+def test_forecast_matches_keras(models, batch, days):
+    keras_model, lstm = models
+    x = _windows(batch, seed=days)
+    expected = forecast.forecast_scaled(keras_model, x, days)
+    actual = lstm.forecast_scaled(x, days)
+    assert actual.shape == (batch, days)
+    np.testing.assert_allclose(actual, expected, atol=PARITY_TOLERANCE)
+
+
+def test_forecast_accepts_flat_windows(models):
+    _, lstm = models
+    x = _windows(4)
+    np.testing.assert_array_equal(lstm.forecast_scaled(x.reshape(4, -1), 5), lstm.forecast_scaled(x, 5))
+
+
+def test_export_round_trip(models, tmp_path):
+    keras_model, lstm = models
+    model_path = str(tmp_path / 'TEST_1d_lstm_model.h5')
+    keras_model.save(model_path)
+    assert export(keras_model, model_path) <= PARITY_TOLERANCE
+
+    loaded = load_exported(model_path)
+    assert isinstance(loaded, NumpyLSTM)
+    x = _windows(5)
+    np.testing.assert_array_equal(loaded.forecast_scaled(x, 10), lstm.forecast_scaled(x, 10))
+
+
+def test_export_rejects_a_diverging_forecast(models, tmp_path, monkeypatch):
+    import lstm_numpy
+
+    keras_model, _ = models
+    broken = from_keras(keras_model)
+    forecast_scaled = broken.forecast_scaled
+    broken.forecast_scaled = lambda windows, days: forecast_scaled(windows, days) + 1e-2
+    assert parity_error(keras_model, broken) >= 1e-2
+
+    monkeypatch.setattr(lstm_numpy, 'from_keras', lambda model: broken)
+    model_path = str(tmp_path / 'TEST_1d_lstm_model.h5')
+    with pytest.raises(ValueError):
+        export(keras_model, model_path)
+    assert load_exported(model_path) is None
+
+
+def test_stacked_models_match_each_model():
+    keras_models = [build_lstm_model((WINDOW_SIZE, 1), 1) for _ in range(3)]
+    lstms = [from_keras(m) for m in keras_models]
+    stacked = StackedLSTM(lstms)
+    x = np.random.default_rng(1).random((3, 5, WINDOW_SIZE), dtype=np.float32)
+    np.testing.assert_allclose(stacked(x), np.stack([l(x[i]) for i, l in enumerate(lstms)]), atol=1e-6)
+    np.testing.assert_allclose(stacked.forecast_scaled(x, 7),
+                               np.stack([l.forecast_scaled(x[i], 7) for i, l in enumerate(lstms)]), atol=1e-6)
+
+
+def test_stacking_needs_one_architecture(models):
+    _, lstm = models
+    other = from_keras(build_lstm_model((WINDOW_SIZE, 1), 2))
+    with pytest.raises(ValueError, match='architecture'):
+        StackedLSTM([lstm, other])
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip('keras')
+
+import model
+
+
+def test_trained_model_is_served_from_its_numpy_export(prices, monkeypatch):
+    monkeypatch.setattr(model, 'INFERENCE_SOCKET', None)
+    monkeypatch.setattr(model, 'NUMPY_INFERENCE', True)
+    model.train_lstm_model('TEST', 1, epochs=1, df=prices, warm_start=False)
+
+    paths = model.stored_model_meta('TEST', 1)['paths']
+    served, _ = model.model_cache.get(paths['model'], paths['scaler'])
+    assert type(served).__name__ == 'NumpyLSTM'
+
+
+def test_progress_reports_a_nan_loss_as_null():
+    reports = []
+    callback = model.progress_callback(lambda **progress: reports.append(progress))
+    callback.set_params({'epochs': 3})
+    callback.on_epoch_end(0, {'loss': float('nan')})
+    callback.on_epoch_end(1, {'loss': 0.5})
+    assert reports == [{'epoch': 1, 'epochs': 3, 'loss': None}, {'epoch': 2, 'epochs': 3, 'loss': 0.5}]
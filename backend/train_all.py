@@ -0,0 +1,157 @@
+"""
+Bulk model refresh: trains LSTM models for a universe of tickers so they are warm
+before the first /api/predict request.
+
+Run from the backend directory, e.g. as a nightly job before market open:
+
+    python train_all.py --universe sp500 --days 30 --workers 4 --threads 2
+    python train_all.py AAPL AMZN SBIN.NS --days 7 30
+
+Each worker process runs one TensorFlow session at a time with its thread pools
+capped at --threads, so --workers bounds the number of concurrent trainings.
+Tickers whose stored model already matches the current data and hyperparameters
+are skipped; stored models a few bars behind are fine-tuned on the new bars
+instead of retrained (pass --full to train from scratch). A JSON report with
+timing and final loss per ticker is written to --report. With the default
+MODEL_MODE=recursive one model per ticker serves every horizon, so --days only
+selects models under MODEL_MODE=direct.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+DEFAULT_REPORT = os.path.join('models', 'train_report.json')
+
+
+def _init_worker(threads: int):
+    # Thread limits must be in place before TensorFlow is first imported.
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _train_one(ticker: str, prediction_days: int, epochs: int, force: bool, full: bool = False) -> dict:
+    import model
+
+    result = {'ticker': ticker, 'prediction_days': prediction_days}
+    start = time.perf_counter()
+    try:
+        if not force and model.has_fresh_model(ticker, prediction_days, epochs):
+            result['status'] = 'skipped'
+        else:
+            model.train_lstm_model(ticker, prediction_days, epochs, warm_start=False if full else None)
+            result['status'] = 'trained'
+        meta = model.registry.meta(ticker, model.model_horizon(prediction_days)) or {}
+        result['loss'] = meta.get('loss')
+        result['training'] = meta.get('training')
+        result['data_version'] = meta.get('data_version')
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def load_universe(args) -> list[str]:
+    tickers = [t.upper().strip() for t in args.tickers]
+    if args.file:
+        with open(args.file) as f:
+            tickers += [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    if args.universe == 'sp500':
+        from stock_data import get_sp500_symbols
+        tickers += get_sp500_symbols()
+    elif args.universe == 'trending':
+        from stock_data import TRENDING_TICKERS
+        tickers += TRENDING_TICKERS
+    # Keep first occurrence order, drop duplicates
+    return list(dict.fromkeys(tickers))
+
+
+def train_universe(tickers: list[str], horizons: list[int], epochs: int = 10, workers: int = 2,
+                   threads: int = 1, force: bool = False, max_tasks_per_child: int = 20,
+                   full: bool = False) -> list[dict]:
+    """
+    Trains every (ticker, horizon) pair across a spawn-based process pool and returns
+    one result dict per pair with status ('trained', 'skipped' or 'failed'), seconds
+    and final loss.
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(threads,),
+        max_tasks_per_child=max_tasks_per_child,
+    ) as pool:
+        futures = [
+            pool.submit(_train_one, ticker, days, epochs, force, full)
+            for ticker in tickers for days in horizons
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            loss = f"{result['loss']:.5f}" if result.get('loss') is not None else '-'
+            print(f"[{done}/{len(futures)}] {result['ticker']} {result['prediction_days']}d "
+                  f"{result['status']} in {result['seconds']}s (loss {loss})", flush=True)
+    return results
+
+
+def write_report(results: list[dict], path: str, elapsed: float):
+    summary = {
+        'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'elapsed_seconds': round(elapsed, 3),
+        'trained': sum(r['status'] == 'trained' for r in results),
+        'skipped': sum(r['status'] == 'skipped' for r in results),
+        'failed': sum(r['status'] == 'failed' for r in results),
+        'results': sorted(results, key=lambda r: (r['ticker'], r['prediction_days'])),
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train LSTM models for a universe of tickers.')
+    parser.add_argument('tickers', nargs='*', help='Ticker symbols to train')
+    parser.add_argument('--universe', choices=['sp500', 'trending'], help='Add a predefined ticker universe')
+    parser.add_argument('--file', help='File with one ticker per line')
+    parser.add_argument('--days', type=int, nargs='+', default=[30], help='Prediction horizons to train')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Concurrent training processes')
+    parser.add_argument('--threads', type=int, default=1, help='TensorFlow threads per process')
+    parser.add_argument('--force', action='store_true', help='Retrain even if the stored model is fresh')
+    parser.add_argument('--full', action='store_true', help='Train from scratch instead of fine-tuning stored models')
+    parser.add_argument('--report', default=DEFAULT_REPORT, help='Where to write the JSON summary')
+    args = parser.parse_args(argv)
+
+    tickers = load_universe(args)
+    if not tickers:
+        parser.error('no tickers given; pass symbols, --file or --universe')
+
+    # In recursive mode every horizon is served by the same single-step model
+    from model import model_horizon
+    horizons = list(dict.fromkeys(model_horizon(days) for days in args.days))
+
+    start = time.perf_counter()
+    results = train_universe(tickers, horizons, args.epochs, args.workers, args.threads, args.force,
+                             full=args.full)
+    summary = write_report(results, args.report, time.perf_counter() - start)
+    print(f"Trained {summary['trained']}, skipped {summary['skipped']}, failed {summary['failed']} "
+          f"in {summary['elapsed_seconds']}s. Report: {args.report}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
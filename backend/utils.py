@@ -1,4 +1,13 @@
+import os
+import time
 import logging
+import threading
+
+from price_cache import normalize_ticker
+from symbols import get_symbol_index
+
+# How long a symbol that failed to load is rejected without another lookup
+REJECTED_TICKER_TTL = int(os.environ.get('REJECTED_TICKER_TTL', 600))
 
 # Set up logging
 def setup_logger():
@@ -17,12 +26,59 @@ def handle_error(error_message, status_code=500):
         'status_code': status_code
     }
 
-# Check if ticker is valid (basic check, can be extended)
+class TTLSet:
+    """Set of strings whose members expire after `ttl` seconds; bounded to `max_size` entries."""
+
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        with self._lock:
+            if len(self._expiry) >= self.max_size:
+                now = time.time()
+                self._expiry = {k: v for k, v in self._expiry.items() if v > now}
+                if len(self._expiry) >= self.max_size:
+                    self._expiry.pop(next(iter(self._expiry)))
+            self._expiry[item] = time.time() + self.ttl
+
+    def discard(self, item):
+        with self._lock:
+            self._expiry.pop(item, None)
+
+    def __contains__(self, item):
+        expiry = self._expiry.get(item)
+        return expiry is not None and expiry > time.time()
+
+# Symbols whose data could not be loaded recently
+rejected_tickers = TTLSet(REJECTED_TICKER_TTL)
+
+def is_known_ticker(ticker):
+    return ticker in get_symbol_index()
+
+def reject_ticker(ticker):
+    """Remembers that a ticker failed to load. Symbols in the index are never rejected,
+    so a Yahoo outage cannot blacklist real tickers."""
+    try:
+        ticker = normalize_ticker(ticker)
+    except ValueError:
+        return
+    if not is_known_ticker(ticker):
+        rejected_tickers.add(ticker)
+
+# Check if ticker is valid without touching the network: well-formed, and either a
+# known symbol or not recently rejected. Unknown symbols are confirmed by the data
+# fetch, which calls reject_ticker() when they turn out not to exist.
 def is_valid_ticker(ticker):
-    # Here we could implement more sophisticated validation like checking if the ticker exists
-    if not ticker or len(ticker) < 1 or len(ticker) > 5:
+    try:
+        ticker = normalize_ticker(ticker)
+    except ValueError:
         return False
-    return True
+    if is_known_ticker(ticker):
+        return True
+    return ticker not in rejected_tickers
 
 # Data validation (can be extended as needed)
 def validate_prediction_days(days):
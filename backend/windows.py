@@ -0,0 +1,66 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+WINDOW_SIZE = 60
+
+# Above this many samples train_lstm_model streams windows through tf.data
+# instead of handing Keras the whole (samples, 60, 1) array at once.
+DATASET_THRESHOLD = 20_000
+
+
+def _as_series(series) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(series, dtype=np.float32).reshape(-1))
+
+
+def sliding_windows(series, window: int = WINDOW_SIZE, horizon: int = 1):
+    """
+    Builds supervised training pairs from a 1-D series without copying it.
+
+    :param series: 1-D array (or (n, 1) column) of scaled prices.
+    :param window: Number of past steps in each input.
+    :param horizon: Number of future steps in each target.
+    :return: (X, y) with shapes (samples, window, 1) and (samples, horizon). Both are
+             strided views into one float32 copy of `series`, so they must not be
+             written to.
+    """
+    series = _as_series(series)
+    if len(series) < window + horizon:
+        raise ValueError("Insufficient data to build training windows.")
+    views = sliding_window_view(series, window + horizon)
+    return views[:, :window, np.newaxis], views[:, window:]
+
+
+def input_windows(series, window: int = WINDOW_SIZE):
+    """
+    Returns every `window`-long input in a 1-D series as a (samples, window, 1) view.
+    Window i covers series[i:i + window] and is used to predict series[i + window].
+    """
+    series = _as_series(series)
+    if len(series) < window:
+        raise ValueError("Insufficient data to build input windows.")
+    return sliding_window_view(series, window)[:, :, np.newaxis]
+
+
+def windows_dataset(series, window: int = WINDOW_SIZE, horizon: int = 1, batch_size: int = 32):
+    """
+    Same pairs as sliding_windows(), as a batched and prefetched tf.data pipeline that
+    materializes one batch at a time. Meant for long (e.g. 10-year or intraday)
+    histories where the full window array would not fit comfortably in memory.
+    """
+    import tensorflow as tf
+
+    series = _as_series(series)
+    if len(series) < window + horizon:
+        raise ValueError("Insufficient data to build training windows.")
+    return (
+        tf.data.Dataset.from_tensor_slices(series)
+        .window(window + horizon, shift=1, drop_remainder=True)
+        .flat_map(lambda w: w.batch(window + horizon))
+        .map(lambda w: (tf.expand_dims(w[:window], -1), w[window:]), num_parallel_calls=tf.data.AUTOTUNE)
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+
+def sample_count(series_length: int, window: int = WINDOW_SIZE, horizon: int = 1) -> int:
+    return max(0, series_length - window - horizon + 1)
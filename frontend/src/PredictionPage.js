@@ -1,8 +1,13 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import axios from 'axios';
 import { Spinner, Alert, ButtonGroup, Button } from 'react-bootstrap';
 
+const API_BASE = 'http://localhost:5000';
+const JOB_POLL_MS = 1500;
+// Give up on a training job after about 10 minutes
+const MAX_JOB_POLLS = 400;
+
 export default function PredictionPage() {
   const { ticker } = useParams();
   const [days, setDays] = useState(30);
@@ -11,9 +16,12 @@ export default function PredictionPage() {
   const [oneYearChart, setOneYearChart] = useState(null);
   const [next30Chart, setNext30Chart] = useState(null);
   const [info, setInfo] = useState(null);
+  const [backtest, setBacktest] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  const [progress, setProgress] = useState(null);
   const [darkMode, setDarkMode] = useState(false);
+  const requestRef = useRef(null);
 
   const formatNumber = (num) => {
     if (typeof num === 'number') return num.toLocaleString();
@@ -25,7 +33,24 @@ export default function PredictionPage() {
     return num;
   };
 
-  const fetchPrediction = async () => {
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  // Training runs as a background job; poll until it finishes, the page moves on
+  // to another ticker or range (signal aborted), or MAX_JOB_POLLS is reached.
+  const waitForJob = async (jobId, signal) => {
+    for (let poll = 0; poll < MAX_JOB_POLLS; poll++) {
+      await sleep(JOB_POLL_MS);
+      signal.throwIfAborted();
+      const res = await axios.get(`${API_BASE}/api/jobs/${jobId}`, { signal });
+      const job = res.data;
+      setProgress(job.progress);
+      if (job.status === 'done') return job.result;
+      if (job.status === 'failed') throw new Error(job.error);
+    }
+    throw new Error('Training is taking too long, please try again later.');
+  };
+
+  const fetchPrediction = async (signal) => {
     if (!ticker) {
       setError('No ticker symbol provided.');
       return;
@@ -38,28 +63,42 @@ export default function PredictionPage() {
     setOneYearChart(null);
     setNext30Chart(null);
     setInfo(null);
+    setBacktest(null);
+    setProgress(null);
 
     try {
-      const res = await axios.get(`http://localhost:5000/api/predict?ticker=${ticker}&days=${days}`);
-      const data = res.data;
+      const res = await axios.get(`${API_BASE}/api/predict?ticker=${ticker}&days=${days}`, { signal });
+      const data = res.status === 202 ? await waitForJob(res.data.job_id, signal) : res.data;
 
+      // Charts are served as cacheable images; the response only carries their URLs
+      const charts = data.charts || {};
       setPriceChart(data.price_comparison_graph);
-      setCandlestickChart(data.candlestick_chart);
-      setOneYearChart(data.one_year_comparison_chart);
-      setNext30Chart(data.next_30_days_chart);
+      setCandlestickChart(charts.candlestick && `${API_BASE}${charts.candlestick}`);
+      setOneYearChart(charts.overlay && `${API_BASE}${charts.overlay}`);
+      setNext30Chart(charts.next30 && `${API_BASE}${charts.next30}`);
+      setBacktest(data.backtest || null);
       setInfo(data.info || 'No info available');
     } catch (err) {
+      if (signal.aborted) return;
       console.error(err);
       setError(err.response?.data?.error || 'Failed to fetch prediction.');
     } finally {
-      setLoading(false);
+      if (!signal.aborted) setLoading(false);
     }
   };
 
+  // Starts a fetch and cancels the one in flight, if any.
+  const startPrediction = () => {
+    requestRef.current?.abort();
+    requestRef.current = new AbortController();
+    fetchPrediction(requestRef.current.signal);
+  };
+
   useEffect(() => {
     if (ticker) {
-      fetchPrediction();
+      startPrediction();
     }
+    return () => requestRef.current?.abort();
   }, [ticker, days]);
 
   const dayOptions = [
@@ -115,7 +154,7 @@ export default function PredictionPage() {
 
         <div style={{ marginTop: '28px' }}>
           <Button
-            onClick={fetchPrediction}
+            onClick={startPrediction}
             disabled={loading}
             variant={darkMode ? 'light' : 'success'}
             style={{ minWidth: '130px', height: '38px' }}
@@ -128,7 +167,12 @@ export default function PredictionPage() {
       {loading && (
         <div className="my-4 text-center">
           <Spinner animation="border" variant={darkMode ? 'light' : 'primary'} />
-          <p>Loading prediction...</p>
+          <p>
+            {progress?.epoch
+              ? `Training model... epoch ${progress.epoch}/${progress.epochs}` +
+                (Number.isFinite(progress.loss) ? ` (loss ${progress.loss.toFixed(4)})` : '')
+              : 'Loading prediction...'}
+          </p>
         </div>
       )}
 
@@ -138,7 +182,7 @@ export default function PredictionPage() {
         <div className="mb-5">
           <h4>Next 30 Days Price Prediction</h4>
           <img
-            src={`data:image/png;base64,${next30Chart}`}
+            src={next30Chart}
             alt="Next 30 Days Chart"
             className="img-fluid border rounded"
             style={{ borderColor: darkMode ? '#444' : undefined }}
@@ -150,7 +194,7 @@ export default function PredictionPage() {
         <div className="mb-5">
           <h4>Candlestick Chart</h4>
           <img
-            src={`data:image/png;base64,${candlestickChart}`}
+            src={candlestickChart}
             alt="Candlestick Chart"
             className="img-fluid border rounded"
             style={{ borderColor: darkMode ? '#444' : undefined }}
@@ -162,11 +206,22 @@ export default function PredictionPage() {
         <div className="mb-5">
           <h4>1-Year Actual vs Predicted</h4>
           <img
-            src={`data:image/png;base64,${oneYearChart}`}
+            src={oneYearChart}
             alt="1-Year Chart"
             className="img-fluid border rounded"
             style={{ borderColor: darkMode ? '#444' : undefined }}
           />
+          {backtest && (
+            <p className="mt-2">
+              <strong title={backtest.in_sample
+                ? 'Predictions for days the model was trained on; they show how well it fits, not how it does on new data.'
+                : 'Predictions for the most recent days, made by a copy of the model trained without them.'}>
+                {backtest.in_sample ? 'In-sample fit' : 'Out-of-sample backtest'} ({backtest.days} days):
+              </strong>{' '}
+              MAE {backtest.mae} · RMSE {backtest.rmse} · MAPE {backtest.mape}% ·
+              Direction correct {backtest.directional_accuracy}%
+            </p>
+          )}
         </div>
       )}
 